@@ -0,0 +1,141 @@
+import argparse
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from feature_labels import read_weights
+from instrumentation import run, stage
+from price_store import load_prices
+from rolling_stats import rolling_mean_std, simple_returns
+
+# Vectorized backtest of daily weight matrices against the close prices. Every array carries a
+# leading batch axis, so many weight sets (thresholds, lookbacks, solvers) are evaluated in one pass.
+# Usage: python backtest.py [weights.csv ...] [--thresholds 0.01 0.05] [--cost-bps 10] [--window 21]
+
+# (batch x dates) arrays; row t is the return earned from date t-1's close to date t's close
+# by holding the weights chosen on date t-1
+BacktestResult = namedtuple('BacktestResult', ['gross', 'costs', 'net', 'turnover', 'equity', 'drawdown',
+                                               'rolling_vol', 'rolling_sharpe'])
+
+TRADING_DAYS = 252
+risk_free_rate = 0.0463
+
+
+def align(weights, df_pivot):
+    """Weights and prices on the weights' dates and instruments.
+
+    weights is a (dates x instruments) frame as in optimized_portfolio_weights_daily.csv,
+    or a list of them, which are stacked along a leading batch axis on the first frame's
+    dates and columns (missing entries hold no position). Returns (dates, weights array of
+    shape batch x dates x assets, prices array of shape dates x assets).
+    """
+    frames = weights if isinstance(weights, (list, tuple)) else [weights]
+    dates = pd.to_datetime(frames[0].index)
+    columns = frames[0].columns
+    stacked = np.stack([frame.set_axis(pd.to_datetime(frame.index)).reindex(index=dates, columns=columns)
+                        .fillna(0.0).to_numpy(dtype=float) for frame in frames])
+    prices = df_pivot.reindex(index=dates, columns=columns).to_numpy(dtype=float)
+    return dates, stacked, prices
+
+
+def backtest(weights, prices, cost_bps=10.0, window=21, risk_free_rate=risk_free_rate):
+    """P&L, turnover, cost drag and rolling risk for (batch x dates x assets) weights.
+
+    Weights chosen on a date are held until the next date's close; they drift with the
+    asset returns in between and rebalancing back to the next weights costs
+    cost_bps basis points per unit of turnover (the first date buys the initial book).
+    Missing prices give a zero return for that asset and day. 2-D weights are treated
+    as a batch of one.
+    """
+    weights = np.asarray(weights, dtype=float)
+    if weights.ndim == 2:
+        weights = weights[None]
+    returns = np.nan_to_num(simple_returns(np.asarray(prices, dtype=float)))
+
+    held = weights[:, :-1]
+    gross = np.zeros(weights.shape[:2])
+    gross[:, 1:] = np.einsum('btn,tn->bt', held, returns[1:])
+
+    # Weights just before each rebalance, after drifting with the day's returns
+    drifted = np.zeros_like(weights)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        drifted[:, 1:] = held * (1.0 + returns[1:]) / (1.0 + gross[:, 1:, None])
+    turnover = np.abs(weights - np.nan_to_num(drifted)).sum(axis=2)
+    costs = turnover * cost_bps / 1e4
+    net = gross - costs
+
+    equity = np.cumprod(1.0 + net, axis=1)
+    drawdown = equity / np.maximum.accumulate(equity, axis=1) - 1.0
+
+    mean, std = rolling_mean_std(net, window, axis=1)
+    rolling_vol = std * np.sqrt(TRADING_DAYS)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rolling_sharpe = (mean * TRADING_DAYS - risk_free_rate) / rolling_vol
+    return BacktestResult(gross, costs, net, turnover, equity, drawdown, rolling_vol, rolling_sharpe)
+
+
+def summary(result, labels=None, risk_free_rate=risk_free_rate):
+    """One row per weight set: annualized return, volatility, Sharpe, max drawdown, turnover and cost drag."""
+    num_days = result.net.shape[1]
+    annual_return = result.equity[:, -1] ** (TRADING_DAYS / num_days) - 1.0
+    annual_vol = result.net.std(axis=1, ddof=1) * np.sqrt(TRADING_DAYS)
+    return pd.DataFrame({
+        'total_return': result.equity[:, -1] - 1.0,
+        'annual_return': annual_return,
+        'annual_vol': annual_vol,
+        'sharpe': (result.net.mean(axis=1) * TRADING_DAYS - risk_free_rate) / annual_vol,
+        'max_drawdown': result.drawdown.min(axis=1),
+        'mean_daily_turnover': result.turnover.mean(axis=1),
+        'annual_cost_drag': result.costs.mean(axis=1) * TRADING_DAYS,
+    }, index=pd.Index(labels if labels is not None else range(len(result.net)), name='weights'))
+
+
+def threshold_weights(weights, thresholds):
+    """Stack of weight sets with positions below each threshold dropped and the rest renormalized.
+
+    weights is (dates x assets); returns (thresholds x dates x assets). Dates where nothing
+    clears a threshold keep the original weights.
+    """
+    weights = np.asarray(weights, dtype=float)
+    kept = np.where(weights[None] >= np.asarray(thresholds)[:, None, None], weights[None], 0.0)
+    totals = kept.sum(axis=2, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(totals > 0, kept / totals, weights[None])
+
+
+def daily_frame(result, dates, batch=0):
+    """Per-date backtest columns of one weight set."""
+    return pd.DataFrame({field: values[batch] for field, values in result._asdict().items()},
+                        index=pd.Index(dates, name='Date'))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Vectorized backtest of daily portfolio weights.')
+    parser.add_argument('weights', nargs='*', default=['optimized_portfolio_weights_daily.csv'])
+    parser.add_argument('--thresholds', type=float, nargs='*', default=[],
+                        help='also backtest the first weight set with positions below each threshold dropped')
+    parser.add_argument('--cost-bps', type=float, default=10.0, help='transaction cost per unit of turnover')
+    parser.add_argument('--window', type=int, default=21, help='days in the rolling volatility and Sharpe window')
+    args = parser.parse_args()
+
+    with run('backtest'):
+        with stage('load'):
+            df_pivot = load_prices('dividend_data.csv')
+            dates, weights, prices = align([read_weights(path) for path in args.weights], df_pivot)
+            labels = list(args.weights)
+            if args.thresholds:
+                weights = np.concatenate([weights, threshold_weights(weights[0], args.thresholds)])
+                labels += [f'{args.weights[0]} >= {t:g}' for t in args.thresholds]
+
+        with stage('backtest') as st:
+            result = backtest(weights, prices, cost_bps=args.cost_bps, window=args.window)
+            st.count('weight_sets', len(weights))
+            st.count('dates', len(dates))
+
+        results = summary(result, labels)
+        results.to_csv('backtest_summary.csv')
+        daily_frame(result, dates).to_csv('backtest_daily.csv')
+
+    print(results.to_string())
+    print("Summary saved to backtest_summary.csv, per-date results for the first weight set to backtest_daily.csv")
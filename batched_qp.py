@@ -0,0 +1,123 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from sharpe_solver import negative_sharpe_ratio
+
+
+def _solve_passive(cov, excess, passive):
+    """Solve cov_PP z_P = excess_P for every date at once, with z = 0 off the passive set."""
+    both = passive[:, :, None] & passive[:, None, :]
+    system = np.where(both, cov, 0.0)
+    idx = np.arange(cov.shape[1])
+    system[:, idx, idx] += ~passive
+    rhs = np.where(passive, excess, 0.0)
+    return np.linalg.solve(system, rhs[:, :, None])[:, :, 0]
+
+
+def tangency_weights(mean_returns, cov_matrices, risk_free_rate, tol=1e-10, ridge=1e-10, var_tol=1e-12, max_iter=None):
+    """Long-only max-Sharpe weights for a stack of dates in one vectorized solve.
+
+    mean_returns is (dates x assets) and cov_matrices is (dates x assets x assets), both of
+    daily returns. The tangency problem min y'Sy s.t. (mu - r)'y = 1, y >= 0 is solved in its
+    equivalent form min 0.5 z'Sz - (mu - r)'z s.t. z >= 0 by a Lawson-Hanson active-set
+    method run on all dates together, then z is normalized to sum to one.
+
+    Returns (weights, converged, iterations). Dates where no asset has a positive excess
+    return have no tangency portfolio; their weights are NaN and converged is False. So do
+    dates whose solution has numerically zero variance (at most var_tol times the average
+    asset variance): a window with fewer returns than assets can have a singular sample
+    covariance on the chosen assets, which makes the Sharpe ratio unbounded. Assets with
+    NaN statistics are left out of that date's portfolio.
+    """
+    mean_returns = np.asarray(mean_returns, dtype=float)
+    cov = np.array(cov_matrices, dtype=float)
+    num_dates, num_assets = mean_returns.shape
+    idx = np.arange(num_assets)
+    rows = np.arange(num_dates)
+
+    # Drop assets with missing statistics by giving them zero excess return and unit variance
+    missing = np.isnan(mean_returns) | np.isnan(cov[:, idx, idx])
+    excess = np.where(missing, 0.0, mean_returns - risk_free_rate / 252)
+    cov = np.where(missing[:, :, None] | missing[:, None, :], 0.0, np.nan_to_num(cov))
+    cov[:, idx, idx] += missing
+
+    # A small ridge keeps the rank-deficient sample covariances invertible on the passive set;
+    # the unridged matrices are kept to check the variance of the result
+    base = cov.copy()
+    scale = np.trace(cov, axis1=1, axis2=2) / num_assets
+    cov[:, idx, idx] += ridge * scale[:, None]
+    threshold = tol * np.abs(excess).max(axis=1)
+
+    max_iter = 3 * num_assets if max_iter is None else max_iter
+    z = np.zeros((num_dates, num_assets))
+    passive = np.zeros((num_dates, num_assets), dtype=bool)
+    iterations = np.zeros(num_dates, dtype=int)
+    active = np.ones(num_dates, dtype=bool)
+    for it in range(max_iter):
+        # Add the asset whose objective gradient most favours increasing it
+        grad = excess - np.einsum('dij,dj->di', cov, z)
+        candidates = np.where(passive, -np.inf, grad)
+        best = candidates.argmax(axis=1)
+        active &= candidates[rows, best] > threshold
+        if not active.any():
+            break
+        passive[active, best[active]] = True
+        iterations[active] += 1
+
+        # Solve on the passive set, stepping back towards z whenever that leaves the feasible region
+        inner = active.copy()
+        for _ in range(num_assets):
+            sub = np.flatnonzero(inner)
+            s = _solve_passive(cov[sub], excess[sub], passive[sub])
+            bad = passive[sub] & (s <= 0)
+            infeasible = bad.any(axis=1)
+            z[sub[~infeasible]] = s[~infeasible]
+            inner[sub[~infeasible]] = False
+            if not infeasible.any():
+                break
+            step_rows = sub[infeasible]
+            z_old = z[step_rows]
+            s_bad = s[infeasible]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                ratio = np.where(bad[infeasible], z_old / (z_old - s_bad), np.inf)
+            alpha = ratio.min(axis=1)[:, None]
+            z_new = z_old + alpha * (s_bad - z_old)
+            keep = passive[step_rows] & (z_new > 0)
+            passive[step_rows] = keep
+            z[step_rows] = np.where(keep, z_new, 0.0)
+
+    totals = z.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        weights = z / totals[:, None]
+    variance = np.einsum('di,dij,dj->d', np.nan_to_num(weights), base, np.nan_to_num(weights))
+    converged = ~active & (totals > 0) & (variance > var_tol * scale)
+    weights[~converged] = np.nan
+    return weights, converged, iterations
+
+
+def solve_batch(means, covs, risk_free_rate, **kwargs):
+    """Batched tangency weights plus per-date stats in the same shape solve_max_sharpe reports."""
+    start = time.perf_counter()
+    weights, converged, iterations = tangency_weights(means, covs, risk_free_rate, **kwargs)
+    seconds = (time.perf_counter() - start) / max(len(weights), 1)
+    stats = [{'nit': int(n), 'nfev': 0, 'njev': 0, 'seconds': seconds, 'success': bool(ok)}
+             for n, ok in zip(iterations, converged)]
+    return weights, stats
+
+
+def tolerance_report(dates, batched_weights, slsqp_weights, means, covs, risk_free_rate):
+    """Per-date comparison of batched and SLSQP weights and the Sharpe ratios they reach."""
+    records = []
+    for date, w_qp, w_sl, mean_returns, cov_matrix in zip(dates, batched_weights, slsqp_weights, means, covs):
+        sharpe_qp = -negative_sharpe_ratio(w_qp, mean_returns, cov_matrix, risk_free_rate)
+        sharpe_sl = -negative_sharpe_ratio(w_sl, mean_returns, cov_matrix, risk_free_rate)
+        records.append({
+            'date': date,
+            'max_abs_weight_diff': np.max(np.abs(w_qp - w_sl)),
+            'sharpe_batched': sharpe_qp,
+            'sharpe_slsqp': sharpe_sl,
+            'sharpe_gap': sharpe_qp - sharpe_sl,
+        })
+    return pd.DataFrame.from_records(records).set_index('date')
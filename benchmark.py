@@ -0,0 +1,169 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from batched_qp import tangency_weights
+from feature_labels import build_dataset, split_indices, standardize
+from price_store import load_price_store, pivot_prices_csv, write_price_store
+from regression import expanding_predictions, fit_multi_target, predict, to_labels
+from rolling_stats import rolling_moments
+from sharpe_solver import solve_max_sharpe
+from threshold_sweep import sweep_thresholds
+
+# Times each pipeline stage on synthetic data shaped like dividend_data.csv and feature_data.csv,
+# fully offline, and writes the results as JSON so runs can be compared between commits.
+# Usage: python benchmark.py --assets 65 500 2000 --days 1250 --window 30 --output benchmark.json
+
+NUM_FEATURES = 29
+
+
+def synthetic_prices(num_assets, num_days, seed=0):
+    """Long-format (Instrument, close, Date) business-day closes from a random walk."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2018-11-08', periods=num_days)
+    returns = rng.normal(0.0004, 0.015, size=(num_days, num_assets))
+    closes = 100 * np.exp(np.cumsum(returns, axis=0))
+    instruments = [f'SYN{i:04d}.N' for i in range(num_assets)]
+    return pd.DataFrame({
+        'Instrument': np.repeat(instruments, num_days),
+        'close': closes.T.ravel().round(2),
+        'Date': np.tile(dates.strftime('%Y-%m-%d'), num_assets),
+    })
+
+
+def synthetic_features(num_days, seed=1):
+    """Date-indexed feature closes with the same width as feature_data.csv."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2018-11-08', periods=num_days)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.01, size=(num_days, NUM_FEATURES)), axis=0))
+    return pd.DataFrame(closes, index=pd.Index(dates.strftime('%Y-%m-%d'), name='Date'),
+                        columns=[f'FEAT{i:02d}' for i in range(NUM_FEATURES)])
+
+
+def synthetic_weights(dates, num_assets, seed=2):
+    """Sparse long-only daily weights summing to one, like optimized_portfolio_weights_daily.csv."""
+    rng = np.random.default_rng(seed)
+    raw = rng.exponential(size=(len(dates), num_assets)) ** 4
+    raw[raw < np.quantile(raw, 0.9, axis=1, keepdims=True)] = 0
+    return pd.DataFrame(raw / raw.sum(axis=1, keepdims=True), index=dates,
+                        columns=[f'SYN{i:04d}.N' for i in range(num_assets)])
+
+
+class Timer:
+    """Collect wall-clock seconds for named stages."""
+
+    def __init__(self):
+        self.stages = {}
+
+    def time(self, stage, func, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.stages[stage] = time.perf_counter() - start
+        return result
+
+
+def run_case(num_assets, num_days, window, opt_dates, workdir):
+    """Time every stage for one universe size and return {stage: seconds}."""
+    timer = Timer()
+    prices_csv = os.path.join(workdir, f'prices_{num_assets}.csv')
+    synthetic_prices(num_assets, num_days).to_csv(prices_csv, index=False)
+
+    # Load: CSV parse + dedupe + pivot, then the binary store
+    df_pivot = timer.time('pivot_load_csv', pivot_prices_csv, prices_csv)
+    store = os.path.join(workdir, f'prices_{num_assets}')
+    write_price_store(df_pivot, store, source_csv=prices_csv)
+    timer.time('load_price_store', load_price_store, store, prices_csv)
+
+    # Rolling statistics over every date, keeping only the last opt_dates covariances so memory
+    # does not grow with dates x assets^2
+    dates, sample = [], deque(maxlen=opt_dates)
+
+    def stream_moments():
+        for d, m, c in rolling_moments(df_pivot, lookback_days=window, start=window):
+            dates.append(d.strftime('%Y-%m-%d'))
+            sample.append((d, m, c))
+    timer.time('rolling_stats', stream_moments)
+
+    # Max-Sharpe solves on the last opt_dates dates: cold SLSQP, analytic warm-started SLSQP, batched QP
+    timer.time('optimize_slsqp', lambda: [solve_max_sharpe(m, c, 0.0463, analytic=False) for d, m, c in sample])
+
+    def analytic():
+        previous = None
+        for d, m, c in sample:
+            previous, stats = solve_max_sharpe(m, c, 0.0463, x0=previous)
+    timer.time('optimize_analytic', analytic)
+    means = np.array([m for d, m, c in sample])
+    covs = np.array([c for d, m, c in sample])
+    timer.time('optimize_batched', tangency_weights, means, covs, 0.0463)
+    for stage in ('optimize_slsqp', 'optimize_analytic', 'optimize_batched'):
+        timer.stages[stage + '_per_date'] = timer.stages[stage] / len(sample)
+
+    # Label building from weights and features CSVs, with an empty cache
+    weights_csv = os.path.join(workdir, f'weights_{num_assets}.csv')
+    features_csv = os.path.join(workdir, f'features_{num_assets}.csv')
+    synthetic_weights(dates, num_assets).to_csv(weights_csv)
+    synthetic_features(num_days).to_csv(features_csv)
+    feature_cols = [f'FEAT{i:02d}' for i in range(16)]
+    data = timer.time('build_labels', build_dataset, feature_cols, .000001, weights_csv=weights_csv,
+                      features_csv=features_csv, cache_dir=os.path.join(workdir, 'cache'), export_csv=False)
+    raw = build_dataset(feature_cols, None, weights_csv=weights_csv, features_csv=features_csv,
+                        cache_dir=os.path.join(workdir, 'cache'), export_csv=False)
+
+    # train.py: one multi-target fit on a shuffled split
+    X_scaled = standardize(data.X)
+    train, valid = split_indices(len(X_scaled), seed=0)
+    timer.time('fit_train', lambda: to_labels(predict(X_scaled[valid], *fit_multi_target(X_scaled[train], data.Y[train]))))
+
+    # trainNoFuture.py: expanding-window fits over the last 20% of the training block
+    split = int(len(X_scaled) * 0.8)
+    timer.time('fit_walk_forward', expanding_predictions, X_scaled[:split], data.Y[:split], int(split * 0.6),
+               X_scaled[split:][-1:])
+
+    # optimizer.py: the 100-threshold sweep
+    timer.time('threshold_sweep', sweep_thresholds, raw.X, raw.Y, np.arange(0.01, 1.01, 0.01), seed=0)
+    return timer.stages
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Offline benchmark of the portfolio -> labels -> model pipeline.')
+    parser.add_argument('--assets', type=int, nargs='+', default=[65, 500])
+    parser.add_argument('--days', type=int, default=1250)
+    parser.add_argument('--window', type=int, default=30)
+    parser.add_argument('--opt-dates', type=int, default=5, help='dates solved in the optimization stages')
+    parser.add_argument('--output', default='benchmark.json')
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for num_assets in args.assets:
+            stages = run_case(num_assets, args.days, args.window, args.opt_dates, workdir)
+            results.append({'assets': num_assets, 'days': args.days, 'window': args.window, 'stages': stages})
+            print(f"{num_assets} assets: " + ", ".join(f"{k} {v:.3f}s" for k, v in stages.items()))
+
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'cpu_count': os.cpu_count(),
+        'opt_dates': args.opt_dates,
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Benchmark results saved to {args.output}")
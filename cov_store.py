@@ -0,0 +1,126 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Per-date mean vectors and covariance matrices from the daily optimizer, as two raw
+# memory-mapped arrays, <path>.mean (dates x assets) and <path>.cov (dates x assets x assets),
+# with a <path>.json index of dates, instruments and dtype. Rows are in date order and new
+# dates are appended to the end of both files.
+
+
+def _index_path(path):
+    return path + '.json'
+
+
+def _write_index(path, dates, instruments, dtype):
+    with open(_index_path(path), 'w') as f:
+        json.dump({'dates': list(dates), 'instruments': list(instruments), 'dtype': dtype}, f)
+
+
+def _date_key(date):
+    return pd.Timestamp(date).strftime('%Y-%m-%d')
+
+
+def create_cov_store(path, dates, instruments, dtype='float64'):
+    """Preallocate a store for the given dates, NaN-filled until rows are written.
+
+    Writers open it with CovarianceStore(path, mode='r+') and fill disjoint rows, so
+    chunks optimized in separate processes can write their dates in place.
+    """
+    dates = [_date_key(d) for d in dates]
+    n, m = len(dates), len(instruments)
+    for suffix, shape in (('.mean', (n, m)), ('.cov', (n, m, m))):
+        if n == 0:
+            open(path + suffix, 'wb').close()
+            continue
+        values = np.memmap(path + suffix, dtype=dtype, mode='w+', shape=shape)
+        values[:] = np.nan
+        values.flush()
+        del values
+    _write_index(path, dates, instruments, np.dtype(dtype).name)
+
+
+class CovarianceStore:
+    """Date-indexed random access to a covariance store without reading it into memory.
+
+    mean(date) and cov(date) are O(1) lookups returning views into the memory map, so
+    nothing is copied until the caller does arithmetic on them.
+    """
+
+    def __init__(self, path='covariances', mode='r'):
+        self.path = path
+        self.mode = mode
+        with open(_index_path(path)) as f:
+            index = json.load(f)
+        self.dtype = np.dtype(index['dtype'])
+        self.instruments = pd.Index(index['instruments'], name='Instrument')
+        self.dates = pd.DatetimeIndex(pd.to_datetime(index['dates']), name='Date')
+        self.rows = {date: row for row, date in enumerate(index['dates'])}
+
+        n, m = len(self.dates), len(self.instruments)
+        if n == 0:
+            self.means = np.empty((0, m), dtype=self.dtype)
+            self.covs = np.empty((0, m, m), dtype=self.dtype)
+        else:
+            self.means = np.memmap(path + '.mean', dtype=self.dtype, mode=mode, shape=(n, m))
+            self.covs = np.memmap(path + '.cov', dtype=self.dtype, mode=mode, shape=(n, m, m))
+
+    def __len__(self):
+        return len(self.dates)
+
+    def __contains__(self, date):
+        return _date_key(date) in self.rows
+
+    def row(self, date):
+        """Row of a date in the store, KeyError if it is not there."""
+        return self.rows[_date_key(date)]
+
+    def mean(self, date):
+        return self.means[self.row(date)]
+
+    def cov(self, date):
+        return self.covs[self.row(date)]
+
+    def cov_frame(self, date):
+        """A date's covariance as an instrument x instrument DataFrame sharing the mapped memory."""
+        return pd.DataFrame(self.cov(date), index=self.instruments, columns=self.instruments, copy=False)
+
+    def write(self, date, mean, cov):
+        """Fill an existing date's row (mode='r+')."""
+        row = self.row(date)
+        self.means[row] = mean
+        self.covs[row] = cov
+
+    def flush(self):
+        if isinstance(self.covs, np.memmap):
+            self.means.flush()
+            self.covs.flush()
+
+
+def append_cov_store(path, dates, means, covs, instruments=None, dtype='float64'):
+    """Append dates to the end of a store, creating it if it does not exist.
+
+    Dates must be later than the last stored date, and the instruments must match the
+    store's; they are required when the store is new. Open CovarianceStore objects do not
+    see the new rows until reopened.
+    """
+    dates = [_date_key(d) for d in dates]
+    if not os.path.exists(_index_path(path)):
+        if instruments is None:
+            raise ValueError(f"No covariance store at {path}; pass instruments to create one")
+        create_cov_store(path, [], instruments, dtype)
+    with open(_index_path(path)) as f:
+        index = json.load(f)
+    if instruments is not None and list(instruments) != index['instruments']:
+        raise ValueError(f"Instruments do not match the store at {path}")
+    if index['dates'] and dates and dates[0] <= index['dates'][-1]:
+        raise ValueError(f"Cannot append {dates[0]}, the store at {path} already ends at {index['dates'][-1]}")
+
+    dtype = np.dtype(index['dtype'])
+    with open(path + '.mean', 'ab') as f:
+        f.write(np.ascontiguousarray(means, dtype=dtype).tobytes())
+    with open(path + '.cov', 'ab') as f:
+        f.write(np.ascontiguousarray(covs, dtype=dtype).tobytes())
+    _write_index(path, index['dates'] + dates, index['instruments'], index['dtype'])
@@ -0,0 +1,145 @@
+import numpy as np
+
+from rolling_stats import rolling_moments, rolling_windows
+
+# Covariance backends for the max-Sharpe solve. 'sample' is the pairwise-complete sample
+# covariance used so far; with ~21 returns per 30-day window it is singular once there are
+# more assets than returns. 'ledoit_wolf' shrinks it towards a scaled identity, and 'factor'
+# fits a low-rank-plus-diagonal model B F B' + D, which stays positive definite. Both are for
+# conditioning, not speed: the factored products cost O(n*k), but SLSQP's dense QP subproblem
+# dominates each solve, so the factor model solves no faster than its dense matrix.
+BACKENDS = ('sample', 'ledoit_wolf', 'factor')
+
+# Specific variances are floored at this fraction of the average asset variance so the
+# factor model stays positive definite when the factors explain a return almost exactly
+SPECIFIC_FLOOR = 1e-3
+
+
+class FactorCovariance:
+    """Covariance loadings @ factor_cov @ loadings.T + diag(specific_var), kept in factored form.
+
+    Supports .dot() like an ndarray, so the SLSQP objective can use it wherever it takes a
+    dense covariance matrix. The batched QP and the covariance store need to_dense().
+    """
+
+    def __init__(self, loadings, factor_cov, specific_var):
+        self.loadings = loadings
+        self.factor_cov = factor_cov
+        self.specific_var = specific_var
+
+    @property
+    def shape(self):
+        n = len(self.specific_var)
+        return n, n
+
+    def dot(self, weights):
+        """Covariance times a weight vector (or an n x m block of them) in O(n*k)."""
+        weights = np.asarray(weights, dtype=float)
+        specific = self.specific_var if weights.ndim == 1 else self.specific_var[:, None]
+        return self.loadings @ (self.factor_cov @ (self.loadings.T @ weights)) + specific * weights
+
+    def diagonal(self):
+        return np.einsum('ij,jk,ik->i', self.loadings, self.factor_cov, self.loadings) + self.specific_var
+
+    def to_dense(self):
+        return self.loadings @ self.factor_cov @ self.loadings.T + np.diag(self.specific_var)
+
+
+def _centered(rows):
+    """Column means over non-missing rows and the window demeaned with missing returns set to zero."""
+    count = np.sum(~np.isnan(rows), axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(count > 0, np.nansum(rows, axis=0) / count, np.nan)
+    centered = np.nan_to_num(rows - mean)
+    return mean, centered
+
+
+def ledoit_wolf(rows):
+    """Ledoit-Wolf shrinkage of the window covariance towards mu * I.
+
+    Uses the Ledoit & Wolf (2004) optimal shrinkage intensity (the same estimate as
+    sklearn.covariance.ledoit_wolf), rescaled to the n-1 denominator of the sample path.
+    Missing returns are replaced by the column mean.
+    """
+    mean, X = _centered(rows)
+    T, n = X.shape
+    emp_cov = X.T @ X / T
+    mu = np.trace(emp_cov) / n
+
+    X2 = X ** 2
+    beta = (np.sum(X2.T @ X2) / T - np.sum(emp_cov ** 2)) / (n * T)
+    delta = np.sum((emp_cov - mu * np.eye(n)) ** 2) / n
+    shrinkage = 0.0 if delta == 0 else min(beta, delta) / delta
+
+    shrunk = (1.0 - shrinkage) * emp_cov
+    shrunk.flat[::n + 1] += shrinkage * mu
+    return mean, shrunk * T / (T - 1)
+
+
+def factor_model(rows, factor_rows=None, num_factors=5):
+    """Low-rank-plus-diagonal covariance as a FactorCovariance.
+
+    With factor_rows (the window's factor returns, e.g. ETF and index series) the loadings
+    are OLS betas on the factors that have a full window; without them, or when none do,
+    the top num_factors principal components of the window are used instead. At most
+    len(rows) - 2 factors are kept so the residuals have degrees of freedom left.
+    """
+    mean, X = _centered(rows)
+    T = len(X)
+    asset_var = np.sum(X ** 2, axis=0) / (T - 1)
+
+    factors = None
+    if factor_rows is not None:
+        complete = ~np.isnan(factor_rows).any(axis=0)
+        complete[complete] = factor_rows[:, complete].std(axis=0) > 0
+        if complete.any():
+            factors = factor_rows[:, complete][:, :max(T - 2, 1)]
+            factors = factors - factors.mean(axis=0)
+
+    if factors is not None:
+        betas = np.linalg.lstsq(factors, X, rcond=None)[0]
+        residuals = X - factors @ betas
+        loadings = betas.T
+        factor_cov = factors.T @ factors / (T - 1)
+        specific_var = np.sum(residuals ** 2, axis=0) / max(T - 1 - factors.shape[1], 1)
+    else:
+        k = min(num_factors, max(T - 2, 1))
+        _, s, vt = np.linalg.svd(X, full_matrices=False)
+        loadings = vt[:k].T * (s[:k] / np.sqrt(T - 1))
+        factor_cov = np.eye(k)
+        specific_var = asset_var - np.sum(loadings ** 2, axis=1)
+
+    specific_var = np.maximum(specific_var, SPECIFIC_FLOOR * np.mean(asset_var))
+    return mean, FactorCovariance(loadings, factor_cov, specific_var)
+
+
+def rolling_covariances(df_pivot, backend='sample', factor_prices=None, lookback_days=30, start=30, stop=None,
+                        refresh=50, num_factors=5):
+    """Yield (date, mean_returns, covariance) for each date in df_pivot[start:stop].
+
+    backend='sample' is rolling_moments unchanged. factor_prices is a date x factor price
+    frame on df_pivot's index, only used by the 'factor' backend.
+    """
+    if backend == 'sample':
+        yield from rolling_moments(df_pivot, lookback_days=lookback_days, start=start, stop=stop, refresh=refresh)
+        return
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown covariance backend {backend!r}, expected one of {BACKENDS}")
+
+    windows = rolling_windows(df_pivot, lookback_days=lookback_days, start=start, stop=stop)
+    factor_windows = None
+    if backend == 'factor' and factor_prices is not None:
+        factor_windows = rolling_windows(factor_prices, lookback_days=lookback_days, start=start, stop=stop)
+    for date, rows in windows:
+        if backend == 'ledoit_wolf':
+            mean, cov = ledoit_wolf(rows)
+        else:
+            factor_rows = next(factor_windows)[1] if factor_windows is not None else None
+            mean, cov = factor_model(rows, factor_rows, num_factors=num_factors)
+        yield date, mean, cov
+
+
+def dense(cov):
+    """The covariance as an ndarray, whichever backend produced it."""
+    return cov.to_dense() if isinstance(cov, FactorCovariance) else np.asarray(cov, dtype=float)
+
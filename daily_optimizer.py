@@ -0,0 +1,134 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from batched_qp import solve_batch, tolerance_report
+from cov_store import CovarianceStore, create_cov_store
+from covariance import dense, rolling_covariances
+from sharpe_solver import solve_max_sharpe
+
+
+def optimize_chunk(prices, start, risk_free_rate, solver='analytic', lookback_days=30, block_size=50,
+                   cov_backend='sample', factor_prices=None, cov_store=None):
+    """Optimize every date in prices[start:] and return (weights, stats) dicts keyed by date.
+
+    Warm starts and the rolling-window rebuild both restart every block_size dates, so a
+    chunk that begins on a block boundary gives exactly the numbers the serial run does.
+    cov_backend picks the covariance estimate (see covariance.py); factor_prices holds the
+    factor series on prices' index for the 'factor' backend. With cov_store, the path of a
+    store preallocated for these dates, each date's mean and covariance are written to it,
+    expanding a factor-model covariance to its dense n x n matrix; without it nothing is
+    expanded.
+    """
+    daily_weights = {}
+    solver_stats = {}
+    store = CovarianceStore(cov_store, mode='r+') if cov_store else None
+    previous_weights = None
+    moments = rolling_covariances(prices, cov_backend, factor_prices=factor_prices, lookback_days=lookback_days,
+                                  start=start, refresh=block_size)
+    for step, (date, mean_returns, cov_matrix) in enumerate(moments):
+        if step % block_size == 0:
+            previous_weights = None
+        if solver == 'analytic':
+            weights, stats = solve_max_sharpe(mean_returns, cov_matrix, risk_free_rate, x0=previous_weights)
+            previous_weights = weights
+        else:
+            weights, stats = solve_max_sharpe(mean_returns, cov_matrix, risk_free_rate, analytic=False)
+        daily_weights[date] = weights
+        solver_stats[date] = stats
+        if store is not None:
+            store.write(date, mean_returns, dense(cov_matrix))
+    if store is not None:
+        store.flush()
+    return daily_weights, solver_stats
+
+
+def split_chunks(df_pivot, workers, start=30, lookback_days=30, block_size=50):
+    """Split df_pivot[start:] into contiguous, block-aligned chunks, one per worker.
+
+    Each chunk is (price_slice, first_row) where the slice holds only the rows that
+    chunk's lookback windows touch.
+    """
+    dates = df_pivot.index
+    num_blocks = -(-(len(dates) - start) // block_size)
+    blocks_per_chunk = -(-num_blocks // workers)
+    first_rows = dates.searchsorted(dates - pd.DateOffset(lookback_days), side='left')
+
+    chunks = []
+    for chunk_start in range(start, len(dates), blocks_per_chunk * block_size):
+        chunk_stop = min(chunk_start + blocks_per_chunk * block_size, len(dates))
+        slice_start = first_rows[chunk_start]
+        chunks.append((df_pivot.iloc[slice_start:chunk_stop], chunk_start - slice_start))
+    return chunks
+
+
+def optimize_daily(df_pivot, risk_free_rate, solver='analytic', workers=1, start=30, lookback_days=30, block_size=50,
+                   report=False, cov_backend='sample', factor_prices=None, cov_store=None, cov_store_dtype='float64'):
+    """Run the daily max-Sharpe backtest over df_pivot[start:] on `workers` processes.
+
+    The result does not depend on the worker count: workers=1 runs the same chunks
+    in-process, one after another. solver='batched' solves every date in one vectorized
+    call instead (see optimize_batched) and ignores workers. factor_prices, a date x factor
+    price frame, is aligned to df_pivot's dates here. cov_store is the path of a
+    covariance store (see cov_store.py) to persist every date's mean and covariance to.
+    """
+    if factor_prices is not None:
+        factor_prices = factor_prices.reindex(df_pivot.index).ffill()
+    if cov_store:
+        create_cov_store(cov_store, df_pivot.index[start:], df_pivot.columns, dtype=cov_store_dtype)
+    if solver == 'batched':
+        return optimize_batched(df_pivot, risk_free_rate, start=start, lookback_days=lookback_days, report=report,
+                                cov_backend=cov_backend, factor_prices=factor_prices, cov_store=cov_store)
+
+    chunks = split_chunks(df_pivot, workers, start=start, lookback_days=lookback_days, block_size=block_size)
+    args = [(prices, first_row, risk_free_rate, solver, lookback_days, block_size, cov_backend,
+             None if factor_prices is None else factor_prices.loc[prices.index], cov_store)
+            for prices, first_row in chunks]
+    if workers == 1:
+        results = [optimize_chunk(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(optimize_chunk, *zip(*args)))
+
+    daily_weights = {}
+    solver_stats = {}
+    for chunk_weights, chunk_stats in results:
+        daily_weights.update(chunk_weights)
+        solver_stats.update(chunk_stats)
+
+    weights_df = pd.DataFrame.from_dict(daily_weights, orient='index')
+    weights_df.columns = df_pivot.columns
+    stats_df = pd.DataFrame.from_dict(solver_stats, orient='index')
+    return weights_df, stats_df
+
+
+def optimize_batched(df_pivot, risk_free_rate, start=30, lookback_days=30, report=False, cov_backend='sample',
+                     factor_prices=None, cov_store=None):
+    """Daily weights from the batched tangency QP, falling back to SLSQP on dates it cannot solve.
+
+    With report=True every date is also solved by SLSQP and a tolerance report comparing
+    the two is written to batched_tolerance_report.csv. The QP factorizes dense matrices,
+    so factor-model covariances are expanded here.
+    """
+    dates, means, covs = zip(*rolling_covariances(df_pivot, cov_backend, factor_prices=factor_prices,
+                                                  lookback_days=lookback_days, start=start))
+    means = np.array(means)
+    covs = np.array([dense(c) for c in covs])
+    if cov_store:
+        store = CovarianceStore(cov_store, mode='r+')
+        store.means[:] = means
+        store.covs[:] = covs
+        store.flush()
+    weights, stats = solve_batch(means, covs, risk_free_rate)
+
+    for i in np.flatnonzero(np.isnan(weights).any(axis=1)):
+        weights[i], stats[i] = solve_max_sharpe(means[i], covs[i], risk_free_rate)
+
+    if report:
+        slsqp_weights = [solve_max_sharpe(m, c, risk_free_rate, analytic=False)[0] for m, c in zip(means, covs)]
+        tolerance_report(dates, weights, slsqp_weights, means, covs, risk_free_rate).to_csv('batched_tolerance_report.csv')
+
+    weights_df = pd.DataFrame(weights, index=list(dates), columns=df_pivot.columns)
+    stats_df = pd.DataFrame(stats, index=list(dates))
+    return weights_df, stats_df
@@ -0,0 +1,131 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from cov_store import append_cov_store
+from model_artifact import load_model
+from price_store import load_prices
+from rolling_stats import RollingMoments
+from sharpe_solver import solve_max_sharpe
+
+# End-of-day mode: append one day's closes and feature row, solve only that day's max-Sharpe
+# problem warm-started from the persisted weights, append the weights to the weights CSV and
+# score next-day inclusion labels with the coefficients train.py saved. The day's mean and
+# covariance are appended to the covariance store when determinePortfolio_daily.py wrote one.
+# Usage: python daily_update.py init
+#        python daily_update.py new_prices.csv new_features.csv
+# new_prices.csv is in dividend_data.csv's long format, new_features.csv in feature_data.csv's.
+
+STATE_PATH = 'daily_state.npz'
+MODEL_PATH = 'inclusion_model.npz'
+WEIGHTS_CSV = 'optimized_portfolio_weights_daily.csv'
+COV_STORE = 'covariances'
+
+risk_free_rate = 0.0463  # Change this to the current risk-free rate
+lookback_days = 30
+
+
+def init_state(df_pivot, weights_csv=WEIGHTS_CSV, path=STATE_PATH):
+    """Persist the last lookback window of prices and the latest optimized weights."""
+    last_date = df_pivot.index[-1]
+    window = df_pivot.loc[last_date - pd.DateOffset(lookback_days):]
+    previous_weights = pd.read_csv(weights_csv, index_col=0).iloc[-1][df_pivot.columns].to_numpy(dtype=float)
+    save_state(window, previous_weights, path)
+
+
+def save_state(window, previous_weights, path=STATE_PATH):
+    np.savez(path,
+             dates=np.asarray(window.index.strftime('%Y-%m-%d'), dtype=str),
+             prices=window.to_numpy(dtype=float),
+             instruments=np.asarray(window.columns, dtype=str),
+             previous_weights=previous_weights)
+
+
+def load_state(path=STATE_PATH):
+    """(price window DataFrame, previous weights) from the persisted state."""
+    with np.load(path) as state:
+        window = pd.DataFrame(state['prices'], index=pd.to_datetime(state['dates']), columns=state['instruments'])
+        return window, state['previous_weights']
+
+
+def append_weights(date, weights, instruments, path=WEIGHTS_CSV):
+    """Append one row to the weights CSV, starting a new line if the file does not end with one."""
+    with open(path, 'rb+') as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                f.write(b'\n')
+    pd.DataFrame([weights], index=[date], columns=instruments).to_csv(path, mode='a', header=False)
+
+
+def update_day(window, previous_weights, date, closes, feature_row=None, model=None, cov_store=None):
+    """Advance the window by one day and return (window, weights, labels).
+
+    closes is a Series of that day's close per instrument and feature_row a Series of
+    feature closes. The window keeps only the rows the next day's lookback needs, and
+    its mean/cov match the full-history rolling_moments numbers for this date. With
+    cov_store they are also appended to that covariance store. Raises ValueError if
+    date is not after the window's last date.
+    """
+    date = pd.Timestamp(date)
+    if date <= window.index[-1]:
+        raise ValueError(f"{date:%Y-%m-%d} is not after the last stored date {window.index[-1]:%Y-%m-%d}")
+    window = pd.concat([window, closes.reindex(window.columns).to_frame(date).T])
+    window = window.loc[date - pd.DateOffset(lookback_days):]
+
+    prices = window.to_numpy(dtype=float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns = prices[1:] / prices[:-1] - 1.0
+    moments = RollingMoments(prices.shape[1])
+    moments.reset(returns)
+    mean_returns, cov_matrix = moments.mean(), moments.cov()
+    weights, stats = solve_max_sharpe(mean_returns, cov_matrix, risk_free_rate, x0=previous_weights)
+    if cov_store is not None:
+        append_cov_store(cov_store, [date], mean_returns[None], cov_matrix[None], instruments=window.columns)
+
+    labels = None
+    if model is not None and feature_row is not None:
+        labels = model.labels(model.feature_matrix(feature_row))
+    return window, weights, labels
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'init':
+        init_state(load_prices('dividend_data.csv'))
+        print(f"Saved the rolling window state to {STATE_PATH}")
+        sys.exit(0)
+
+    new_prices = pd.read_csv(sys.argv[1])
+    new_prices['Date'] = pd.to_datetime(new_prices['Date'])
+    new_features = pd.read_csv(sys.argv[2], index_col='Date') if len(sys.argv) > 2 else None
+
+    start = time.perf_counter()
+    window, previous_weights = load_state()
+    model = load_model(MODEL_PATH) if os.path.exists(MODEL_PATH) else None
+    cov_store = COV_STORE if os.path.exists(COV_STORE + '.json') else None
+
+    # Days already in the state are skipped, so rerunning a file does not duplicate rows
+    stale = new_prices['Date'] <= window.index[-1]
+    if stale.any():
+        print(f"Skipping {new_prices.loc[stale, 'Date'].nunique()} day(s) up to {window.index[-1]:%Y-%m-%d} "
+              f"already in {STATE_PATH}")
+        new_prices = new_prices[~stale]
+    for date, rows in new_prices.groupby('Date'):
+        closes = rows.drop_duplicates(subset=['Instrument'], keep='first').set_index('Instrument')['close']
+        key = date.strftime('%Y-%m-%d')
+        feature_row = new_features.loc[key] if new_features is not None and key in new_features.index else None
+        window, previous_weights, labels = update_day(window, previous_weights, date, closes, feature_row, model,
+                                                       cov_store)
+
+        # Append this day's weights to the weights store and save the state with them, so a
+        # failure on a later day leaves the CSV and the state agreeing on the last date
+        append_weights(key, previous_weights, window.columns)
+        save_state(window, previous_weights)
+        if labels is not None:
+            included = [t for t, label in zip(model.tickers, labels) if label]
+            print(f"{key} predicted next-day inclusions: {', '.join(included)}")
+    print(f"Updated {new_prices['Date'].nunique()} day(s) in {(time.perf_counter() - start) * 1000:.1f}ms")
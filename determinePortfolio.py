@@ -1,48 +1,81 @@
 import pandas as pd
 import numpy as np
-from scipy.optimize import minimize
+from price_store import load_prices
+from rebalance_schedule import rebalance_windows
+from batched_qp import solve_batch, tolerance_report
+from sharpe_solver import solve_max_sharpe
 
-# Load CSV data
-df = pd.read_csv('dividend_data.csv')
-df['Date'] = pd.to_datetime(df['Date'])
+# Load the date x instrument closing price matrix, from the binary store if it is up to date
+# and otherwise by pivoting dividend_data.csv
+df_pivot = load_prices('dividend_data.csv')
 
-df = df.drop_duplicates(subset=['Date', 'Instrument'], keep='first')
+risk_free_rate = 0.0463  # Change this to current risk-free rate
 
-# Pivot the table to have instruments as columns, dates as index and closing prices as values
-df_pivot = df.pivot(index='Date', columns='Instrument', values='close')
+# Rebalance frequency: 'M' monthly, 'W' weekly, or an integer number of trading days
+frequency = 'M'
 
-def get_annualized_performance(weights, mean_returns, cov_matrix):
-    """Calculate annualized performance for a portfolio."""
-    returns = np.sum(mean_returns * weights) * 252
-    std_dev = np.sqrt(np.dot(weights.T, np.dot(cov_matrix, weights))) * np.sqrt(252)
-    return std_dev, returns
+# Solver mode: 'analytic' uses exact gradients and warm-starts from the previous month's weights,
+# 'slsqp' is the original finite-difference solve from equal weights, 'batched' solves every
+# month at once as a tangency-portfolio QP
+solver = 'analytic'
 
-def negative_sharpe_ratio(weights, mean_returns, cov_matrix, risk_free_rate):
-    """Calculate the negative Sharpe ratio for a portfolio."""
-    p_std_dev, p_return = get_annualized_performance(weights, mean_returns, cov_matrix)
-    return -(p_return - risk_free_rate) / p_std_dev
+# With solver = 'batched', also solve every month with SLSQP and write batched_tolerance_report_monthly.csv
+report = False
+
+# Periods with fewer return rows than this get no weights, as do periods whose solve fails
+min_returns = 2
 
-risk_free_rate = 0.0463  # Change this to current risk-free rate
 monthly_weights = {}
+solver_stats = {}
+monthly_moments = {}
+previous_weights = None
+skipped = {}
+
+# Each rebalance date gets only its own period's rows
+for date, monthly_data in rebalance_windows(df_pivot, freq=frequency):
+    if len(monthly_data) - 1 < min_returns:
+        skipped[date] = f'{len(monthly_data) - 1} return row(s)'
+        continue
 
-for date in pd.date_range(df_pivot.index.min(), df_pivot.index.max(), freq='M'):
-    # Filter data for the month
-    monthly_data = df_pivot[df_pivot.index.month == date.month]
-    
     # Calculate mean returns and covariance matrix
     mean_returns = monthly_data.pct_change(fill_method=None).mean()
     cov_matrix = monthly_data.pct_change(fill_method=None).cov()
 
 
     # Optimization
-    num_assets = len(mean_returns)
-    args = (mean_returns, cov_matrix, risk_free_rate)
-    constraints = ({'type': 'eq', 'fun': lambda x: np.sum(x) - 1})
-    bound = (0.0, 1.0)
-    bounds = tuple(bound for asset in range(num_assets))
-    result = minimize(negative_sharpe_ratio, num_assets * [1./num_assets], args=args, constraints=constraints, bounds=bounds)
+    if solver == 'batched':
+        monthly_moments[date] = (mean_returns.values, cov_matrix.values)
+        continue
+    if solver == 'analytic':
+        weights, stats = solve_max_sharpe(mean_returns, cov_matrix, risk_free_rate, x0=previous_weights)
+    else:
+        weights, stats = solve_max_sharpe(mean_returns, cov_matrix, risk_free_rate, analytic=False)
+
+    solver_stats[date] = stats
+    if not stats['success']:
+        skipped[date] = 'solver failed'
+        continue
+    monthly_weights[date] = weights
+    if solver == 'analytic':
+        previous_weights = weights
 
-    monthly_weights[date] = result['x']
+# Batched mode solves all months together, with SLSQP for months that have no tangency portfolio
+if solver == 'batched':
+    dates = list(monthly_moments)
+    means = np.array([m for m, c in monthly_moments.values()])
+    covs = np.array([c for m, c in monthly_moments.values()])
+    weights, stats = solve_batch(means, covs, risk_free_rate)
+    for i, date in enumerate(dates):
+        if np.isnan(weights[i]).any():
+            weights[i], stats[i] = solve_max_sharpe(means[i], covs[i], risk_free_rate)
+        solver_stats[date] = stats[i]
+        if not stats[i]['success']:
+            skipped[date] = 'solver failed'
+            continue
+        monthly_weights[date] = weights[i]
+    if report:
+        slsqp_weights = [solve_max_sharpe(m, c, risk_free_rate, analytic=False)[0] for m, c in zip(means, covs)]
+        tolerance_report(dates, weights, slsqp_weights, means, covs, risk_free_rate).to_csv('batched_tolerance_report_monthly.csv')
 
     # Convert the monthly_weights dictionary to a DataFrame
 weights_df = pd.DataFrame.from_dict(monthly_weights, orient='index')
@@ -51,3 +84,11 @@ weights_df.columns = df_pivot.columns  # Set the column names as the stock names
 # Save the DataFrame to a CSV file
 weights_df.to_csv('optimized_portfolio_weights.csv')
 
+# Save iterations and wall time per rebalance date
+stats_df = pd.DataFrame.from_dict(solver_stats, orient='index')
+stats_df.to_csv('solver_stats.csv')
+print(f"{solver} solver: {len(stats_df)} dates, {stats_df['nit'].sum()} iterations, "
+      f"{stats_df['nfev'].sum()} objective calls, {stats_df['seconds'].sum():.2f}s")
+if skipped:
+    print(f"No weights for {len(skipped)} period(s) with fewer than {min_returns} return rows or a failed solve: "
+          + ", ".join(f"{date:%Y-%m-%d}" for date in skipped))
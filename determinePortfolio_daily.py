@@ -1,59 +1,63 @@
-import pandas as pd
-import numpy as np
-from scipy.optimize import minimize
-
-# Load CSV data
-df = pd.read_csv('dividend_data.csv')
-df['Date'] = pd.to_datetime(df['Date'])
-
-df = df.drop_duplicates(subset=['Date', 'Instrument'], keep='first')
+import sys
 
-# Pivot the table to have instruments as columns, dates as index, and closing prices as values
-df_pivot = df.pivot(index='Date', columns='Instrument', values='close')
-
-def get_annualized_performance(weights, mean_returns, cov_matrix):
-    """Calculate annualized performance for a portfolio."""
-    returns = np.sum(mean_returns * weights) * 252
-    std_dev = np.sqrt(np.dot(weights.T, np.dot(cov_matrix, weights))) * np.sqrt(252)
-    return std_dev, returns
+import pandas as pd
 
-def negative_sharpe_ratio(weights, mean_returns, cov_matrix, risk_free_rate):
-    """Calculate the negative Sharpe ratio for a portfolio."""
-    p_std_dev, p_return = get_annualized_performance(weights, mean_returns, cov_matrix)
-    return -(p_return - risk_free_rate) / p_std_dev
+from daily_optimizer import optimize_daily
+from price_store import load_prices
+from instrumentation import run, stage
 
 risk_free_rate = 0.0463  # Change this to the current risk-free rate
 
-# Dictionary to store daily weights
-daily_weights = {}
-
-for date in df_pivot[30:].index:
-
-    # Calculate the start date of the lookback window (length of the current month)
-    lookback_start_date = date - pd.DateOffset(30)
-
-    # Select the data for the lookback window
-    lookback_data = df_pivot.loc[lookback_start_date:date]
-    
-    # Calculate mean returns and covariance matrix
-    mean_returns = lookback_data.pct_change(fill_method=None).mean()
-    cov_matrix = lookback_data.pct_change(fill_method=None).cov()
-
-    # Optimization
-    num_assets = len(mean_returns)
-    args = (mean_returns, cov_matrix, risk_free_rate)
-   
-   # Updated constraint to ensure weights sum to 1
-    constraints = ({'type': 'eq', 'fun': lambda x: np.sum(x) - 1.0})
-    bound = (0.0, 1.0)
-    bounds = tuple(bound for asset in range(num_assets))
-    result = minimize(negative_sharpe_ratio, num_assets * [1./num_assets], args=args, constraints=constraints, bounds=bounds)
-
-    daily_weights[date] = result['x']
-
-# Convert the daily_weights dictionary to a DataFrame
-weights_df_daily = pd.DataFrame.from_dict(daily_weights, orient='index')
-weights_df_daily.columns = df_pivot.columns  # Set the column names as the stock names
-
-# Save the DataFrame to a CSV file
-weights_df_daily.to_csv('optimized_portfolio_weights_daily.csv')
+# Solver mode: 'analytic' uses exact gradients and warm-starts from the previous date's weights,
+# 'slsqp' is the original finite-difference solve from equal weights, 'batched' solves every
+# date at once as a tangency-portfolio QP
+solver = 'analytic'
+
+# Covariance estimate: 'sample' is the 30-day sample covariance, 'ledoit_wolf' shrinks it towards
+# a scaled identity, 'factor' is a low-rank-plus-diagonal model on the factor_columns series from
+# feature_data.csv (principal components of the window where those are missing). These change
+# the estimate, not the speed: SLSQP's cost is the same for every backend
+cov_backend = 'sample'
+factor_columns = ['XLV.PH', 'VNQ', 'XLU', 'XLI', 'XLP', 'SLX']
+
+# Persist every date's mean vector and covariance matrix to a memory-mapped store
+# (covariances.mean/.cov/.json, see cov_store.py); None to skip, 'float32' halves its size
+cov_store = 'covariances'
+cov_store_dtype = 'float64'
+
+# With solver = 'batched', also solve every date with SLSQP and write batched_tolerance_report.csv
+report = False
+
+# Number of worker processes; the output is identical for any value
+workers = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+
+if __name__ == '__main__':
+    with run('determinePortfolio_daily'):
+        # Load the date x instrument closing price matrix, from the binary store if it is up to date
+        # and otherwise by pivoting dividend_data.csv
+        with stage('load_prices'):
+            df_pivot = load_prices('dividend_data.csv')
+            factor_prices = None
+            if cov_backend == 'factor':
+                factor_prices = pd.read_csv('feature_data.csv', index_col='Date', parse_dates=True)[factor_columns]
+
+        # Rolling 30-day max-Sharpe weights for every date after the first 30 rows
+        with stage('optimize') as st:
+            weights_df_daily, stats_df_daily = optimize_daily(df_pivot, risk_free_rate, solver=solver, workers=workers,
+                                                              report=report, cov_backend=cov_backend,
+                                                              factor_prices=factor_prices, cov_store=cov_store,
+                                                              cov_store_dtype=cov_store_dtype)
+            st.count('dates', len(stats_df_daily))
+            st.count('iterations', int(stats_df_daily['nit'].sum()))
+            st.count('function_evaluations', int(stats_df_daily['nfev'].sum()))
+            st.record('per_date', {'nit': stats_df_daily['nit'].tolist(), 'nfev': stats_df_daily['nfev'].tolist()})
+
+        with stage('save'):
+            # Save the DataFrame to a CSV file
+            weights_df_daily.to_csv('optimized_portfolio_weights_daily.csv')
+
+            # Save iterations and wall time per date so solver modes can be compared
+            stats_df_daily.to_csv('solver_stats_daily.csv')
+
+    print(f"{solver} solver, {cov_backend} covariance, {workers} worker(s): {len(stats_df_daily)} dates, {stats_df_daily['nit'].sum()} iterations, "
+          f"{stats_df_daily['nfev'].sum()} objective calls, {stats_df_daily['seconds'].sum():.2f}s")
@@ -0,0 +1,134 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from feature_labels import CACHE_DIR, read_features, write_atomic
+from instrumentation import run, stage
+from rolling_stats import rolling_mean_std
+
+# Log-return features for every feature_data.csv series at once: multi-horizon log returns,
+# lagged daily log returns, rolling z-scores of the log price and rolling volatilities of the
+# daily log return. Written to engineered_features.csv (same Date index as feature_data.csv,
+# columns named <series>_<transform>); walk_forward_cv.py --engineered reads it through
+# build_dataset in place of the raw closes. The train scripts still fit on the raw closes.
+# The matrix is cached with the transform settings and VERSION; when feature_data.csv only
+# gains rows, just the new rows are computed and appended.
+# Usage: python feature_engineering.py [--full]
+
+# Bump when a transform changes so cached matrices are recomputed
+VERSION = 1
+
+HORIZONS = (1, 5, 21)  # log return over the last h rows
+LAGS = (1, 2, 5)  # daily log return from l rows earlier
+WINDOWS = (21, 63)  # rows in the rolling z-score and volatility windows
+
+OUTPUT_CSV = 'engineered_features.csv'
+CACHE_PATH = os.path.join(CACHE_DIR, 'engineered_features.npz')
+
+# Rows of history a new row's features depend on, including the row itself
+HISTORY = max(max(HORIZONS) + 1, max(LAGS) + 2, max(WINDOWS) + 1)
+
+
+def _config():
+    return json.dumps({'version': VERSION, 'horizons': HORIZONS, 'lags': LAGS, 'windows': WINDOWS})
+
+
+def _shift(x, periods):
+    """x moved down `periods` rows, NaN-filled at the top."""
+    out = np.full(x.shape, np.nan)
+    out[periods:] = x[:len(x) - periods]
+    return out
+
+
+def engineer(levels, names):
+    """(rows x series) closes to a (rows x transforms*series) feature matrix and its column names.
+
+    Rows without enough history for a transform are NaN in its columns.
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        log_prices = np.log(np.asarray(levels, dtype=float))
+    daily = log_prices - _shift(log_prices, 1)
+
+    blocks, labels = [], []
+    for h in HORIZONS:
+        blocks.append(log_prices - _shift(log_prices, h))
+        labels.append(f'ret{h}')
+    for lag in LAGS:
+        blocks.append(_shift(daily, lag))
+        labels.append(f'lag{lag}')
+    # z-scores do not change when a series is shifted by a constant, and measuring from the first
+    # log price keeps the running sums of squares small enough not to lose precision
+    first = np.argmax(~np.isnan(log_prices), axis=0)
+    centered = log_prices - np.nan_to_num(log_prices[first, np.arange(log_prices.shape[1])])
+    for window in WINDOWS:
+        mean, std = rolling_mean_std(centered, window)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            blocks.append((centered - mean) / std)
+        labels.append(f'z{window}')
+    for window in WINDOWS:
+        blocks.append(rolling_mean_std(daily, window)[1] * np.sqrt(252))
+        labels.append(f'vol{window}')
+
+    columns = [f'{name}_{label}' for label in labels for name in names]
+    return np.hstack(blocks), columns
+
+
+def engineered_columns(names):
+    """Column names engineer() produces for the given series, in its order."""
+    return engineer(np.ones((1, len(names))), names)[1]
+
+
+def _load_cache(cache_path):
+    if not os.path.exists(cache_path):
+        return None
+    with np.load(cache_path) as cached:
+        if str(cached['config']) != _config():
+            return None
+        return {name: cached[name] for name in cached.files}
+
+
+def update_features(features, cache_path=CACHE_PATH, full=False):
+    """Engineered features for a Date-indexed frame of closes, reusing the cached matrix when possible.
+
+    The cache is reused when its transform settings, series and dates match and its input
+    closes are an exact prefix of `features`; the appended rows are then computed from the
+    last HISTORY rows onward. Otherwise (or with full=True) everything is recomputed.
+    Returns (DataFrame, number of rows computed).
+    """
+    levels = features.to_numpy(dtype=float)
+    dates = np.asarray(features.index, dtype=str)
+    names = list(features.columns)
+
+    cached = None if full else _load_cache(cache_path)
+    start = 0
+    if cached is not None:
+        n = len(cached['dates'])
+        if (list(cached['names']) == names and n <= len(dates) and np.array_equal(cached['dates'], dates[:n])
+                and np.array_equal(cached['levels'], levels[:n], equal_nan=True)):
+            start = n
+
+    if start:
+        lo = max(0, start - HISTORY + 1)
+        new_values, columns = engineer(levels[lo:], names)
+        values = np.vstack([cached['values'], new_values[start - lo:]])
+    else:
+        values, columns = engineer(levels, names)
+
+    os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+    write_atomic(cache_path, lambda f: np.savez(f, config=_config(), names=np.asarray(names, dtype=str), dates=dates,
+                                                levels=levels, values=values), mode='wb')
+    frame = pd.DataFrame(values, index=pd.Index(features.index, name='Date'), columns=columns)
+    return frame, len(dates) - start
+
+
+if __name__ == '__main__':
+    with run('feature_engineering'):
+        with stage('engineer') as st:
+            engineered, computed = update_features(read_features('feature_data.csv'), full='--full' in sys.argv)
+            st.count('rows_computed', computed)
+        with stage('save'):
+            engineered.to_csv(OUTPUT_CSV)
+    print(f"Computed {computed} of {len(engineered)} rows, {engineered.shape[1]} features saved to {OUTPUT_CSV}")
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import tempfile
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from price_store import file_hash
+
+# X is (dates x features), Y is (dates x tickers); row t of Y is the label for the date after dates[t]
+# when the dataset is built with shift=True
+Dataset = namedtuple('Dataset', ['X', 'Y', 'dates', 'tickers', 'features'])
+
+CACHE_DIR = '.feature_cache'
+
+
+def read_weights(weights_csv='optimized_portfolio_weights_daily.csv'):
+    """Daily optimizer weights indexed by date string."""
+    weights = pd.read_csv(weights_csv, index_col=0)
+    weights.index.name = 'date'
+    return weights
+
+
+def read_features(features_csv='feature_data.csv'):
+    """Feature closes indexed by date string."""
+    return pd.read_csv(features_csv, index_col='Date')
+
+
+def label_weights(weights, threshold):
+    """1 where a ticker's weight is at least threshold, else 0."""
+    return (weights >= threshold).astype(float)
+
+
+def _cache_key(weights_csv, features_csv, threshold, feature_cols, shift):
+    key = {
+        'weights': file_hash(weights_csv),
+        'features': file_hash(features_csv),
+        'threshold': repr(threshold),
+        'feature_cols': list(feature_cols),
+        'shift': shift,
+    }
+    return hashlib.sha256(json.dumps(key).encode()).hexdigest()
+
+
+def write_atomic(path, write, mode='w'):
+    """Call write(f) on a temporary file next to path, then move it into place.
+
+    Scripts the pipeline runs in parallel share caches and exports; a reader sees either
+    the old file or the complete new one, never a partly written file.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix=os.path.basename(path) + '.')
+    try:
+        with os.fdopen(fd, mode) as f:
+            write(f)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def _export_csv(weights, features, threshold):
+    """Write weights_labels.csv and features_and_labels.csv as the train scripts used to."""
+    labels = label_weights(weights, threshold)
+    write_atomic('weights_labels.csv', labels.to_csv)
+    merged = pd.merge(left=labels, right=features, left_index=True, right_index=True)
+    write_atomic('features_and_labels.csv', merged.to_csv)
+
+
+def build_dataset(feature_cols, threshold=.000001, shift=True,
+                  weights_csv='optimized_portfolio_weights_daily.csv', features_csv='feature_data.csv',
+                  cache_dir=CACHE_DIR, export_csv=True):
+    """Aligned feature and label arrays for the dates present in both input files.
+
+    Labels are the weights masked at threshold (or the raw weights when threshold is None).
+    With shift=True each row of X is paired with the next date's labels and the last date
+    is dropped, as the train scripts do. Weight and feature columns are kept apart, so a
+    name in both files (PEP.O) refers to the feature. Results are cached in cache_dir keyed
+    by the input file hashes, threshold, feature list and shift; the CSV exports are only
+    rewritten when the cache misses.
+    """
+    feature_cols = list(feature_cols)
+    key = _cache_key(weights_csv, features_csv, threshold, feature_cols, shift)
+    cache_path = os.path.join(cache_dir, key + '.npz')
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as cached:
+            return Dataset(cached['X'], cached['Y'], cached['dates'], cached['tickers'], cached['features'])
+
+    weights = read_weights(weights_csv)
+    features = read_features(features_csv)
+    if export_csv and threshold is not None:
+        _export_csv(weights, features, threshold)
+
+    # Inner join on date, in the weights file's order
+    dates = weights.index[weights.index.isin(features.index)]
+    X = features.loc[dates, feature_cols].to_numpy(dtype=float)
+    Y = weights.loc[dates].to_numpy(dtype=float)
+    if threshold is not None:
+        Y = (Y >= threshold).astype(float)
+    if shift:
+        X, Y, dates = X[:-1], Y[1:], dates[:-1]
+
+    data = Dataset(X, Y, np.asarray(dates, dtype=str), np.asarray(weights.columns, dtype=str),
+                   np.asarray(feature_cols, dtype=str))
+    os.makedirs(cache_dir, exist_ok=True)
+    write_atomic(cache_path, lambda f: np.savez(f, **data._asdict()), mode='wb')
+    return data
+
+
+def labels_frame(data):
+    """Labels as a DataFrame indexed by date with one column per ticker."""
+    return pd.DataFrame(data.Y, index=data.dates, columns=data.tickers)
+
+
+def scaling(X):
+    """Column means and standard deviations as StandardScaler fits them (constant columns get scale 1)."""
+    X = np.asarray(X, dtype=float)
+    scale = X.std(axis=0)
+    scale[scale == 0] = 1.0
+    return X.mean(axis=0), scale
+
+
+def standardize(X):
+    """Scale each column to zero mean and unit variance, as StandardScaler does."""
+    mean, scale = scaling(X)
+    return (np.asarray(X, dtype=float) - mean) / scale
+
+
+def split_indices(num_rows, test_size=0.25, seed=None):
+    """Shuffled train/validation row indices (train_test_split's default sizes); seed=None is unseeded."""
+    order = np.random.default_rng(seed).permutation(num_rows)
+    num_valid = int(np.ceil(test_size * num_rows))
+    return order[num_valid:], order[:num_valid]
@@ -0,0 +1,178 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+# Market data is kept in the same long format as dividend_data.csv: Instrument, close, Date
+COLUMNS = ['Instrument', 'close', 'Date']
+
+
+class EikonProvider:
+    """Fetch daily closes from Eikon.
+
+    kind='close_price' uses ek.get_data with TR.CLOSEPRICE as getData.py did,
+    kind='timeseries' uses ek.get_timeseries CLOSE as get_features.py did.
+    """
+
+    def __init__(self, app_key, kind='close_price'):
+        import eikon as ek
+        ek.set_app_key(app_key)
+        self.ek = ek
+        self.kind = kind
+
+    def fetch(self, instrument, start_date, end_date):
+        if self.kind == 'timeseries':
+            data = self.ek.get_timeseries(instrument,
+                                          fields=['CLOSE'],
+                                          start_date=start_date.strftime("%Y-%m-%d"),
+                                          end_date=end_date.strftime("%Y-%m-%d"))
+            data = data.rename(columns={'CLOSE': 'close'}).rename_axis('Date').reset_index()
+            data['Instrument'] = instrument
+        else:
+            data, data_err = self.ek.get_data(instruments=[instrument],
+                                              fields=[
+                                                  'TR.CLOSEPRICE(Adjusted=0)',
+                                                  'TR.PriceCloseDate'
+                                              ],
+                                              parameters={
+                                                  'SDate': start_date.strftime("%Y-%m-%d"),
+                                                  'EDate': end_date.strftime("%Y-%m-%d"),
+                                                  'Frq': 'D'
+                                              })
+            data = data.rename(columns={'Close Price': 'close'})
+        data = data.dropna()
+        data['Date'] = pd.to_datetime(data['Date']).dt.tz_localize(None).dt.normalize()
+        return data[COLUMNS]
+
+
+class FileProvider:
+    """Serve daily closes from a local long-format CSV, as a stand-in for Eikon."""
+
+    def __init__(self, csv_path):
+        self.data = read_long(csv_path)
+        self.calls = []
+
+    def fetch(self, instrument, start_date, end_date):
+        self.calls.append((instrument, start_date, end_date))
+        rows = self.data[(self.data['Instrument'] == instrument)
+                         & (self.data['Date'] >= pd.Timestamp(start_date))
+                         & (self.data['Date'] <= pd.Timestamp(end_date))]
+        return rows.reset_index(drop=True)
+
+
+class RateLimiter:
+    """Thread-safe limit of `rate` calls per second, allowing bursts of up to `burst`."""
+
+    def __init__(self, rate=5.0, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def read_long(csv_path):
+    """Read a long-format price CSV, or an empty frame if it does not exist yet."""
+    if not os.path.exists(csv_path):
+        return pd.DataFrame(columns=COLUMNS).astype({'Date': 'datetime64[ns]', 'close': float})
+    data = pd.read_csv(csv_path)
+    data['Date'] = pd.to_datetime(data['Date'])
+    return data[COLUMNS]
+
+
+def read_wide(csv_path):
+    """Read a Date-indexed wide CSV such as feature_data.csv into long format."""
+    if not os.path.exists(csv_path):
+        return read_long(csv_path)
+    wide = pd.read_csv(csv_path, index_col='Date', parse_dates=['Date'])
+    data = wide.rename_axis('Instrument', axis=1).stack().rename('close').reset_index()
+    return data[COLUMNS]
+
+
+def to_wide(data, instruments):
+    """Pivot long-format data to a Date-indexed frame with one column per instrument."""
+    wide = data.pivot(index='Date', columns='Instrument', values='close')
+    return wide.reindex(columns=instruments).rename_axis(None, axis=1)
+
+
+def missing_ranges(stored, instruments, start_date, end_date, slack_days=5):
+    """Date ranges each instrument still needs, given what is already stored.
+
+    Returns (instrument, start, end) tuples: the whole range for new instruments, and
+    otherwise only the days after the last stored close (plus the days before the first
+    one when history is missing by more than slack_days, i.e. more than a weekend or holiday).
+    """
+    start_date, end_date = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    bounds = stored.groupby('Instrument')['Date'].agg(['min', 'max'])
+    ranges = []
+    for instrument in instruments:
+        if instrument not in bounds.index:
+            ranges.append((instrument, start_date, end_date))
+            continue
+        first, last = bounds.loc[instrument, 'min'], bounds.loc[instrument, 'max']
+        if (first - start_date).days > slack_days:
+            ranges.append((instrument, start_date, first - pd.Timedelta(days=1)))
+        if last < end_date:
+            ranges.append((instrument, last + pd.Timedelta(days=1), end_date))
+    return ranges
+
+
+def fetch_with_retry(provider, instrument, start_date, end_date, limiter=None, retries=3, backoff=1.0):
+    """Call provider.fetch, waiting on the rate limiter and retrying with exponential backoff."""
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            return provider.fetch(instrument, start_date, end_date)
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(backoff * 2 ** attempt)
+
+
+def update_store(stored, provider, instruments, start_date, end_date, max_workers=8, rate=5.0, retries=3):
+    """Fetch only the missing date ranges concurrently and merge them into the stored data.
+
+    Rows before start_date are dropped so the store keeps the same rolling history a
+    full download would. Instruments whose requests fail after all retries keep their
+    stored rows and are reported in the returned list of failures.
+    """
+    ranges = missing_ranges(stored, instruments, start_date, end_date)
+    limiter = RateLimiter(rate) if rate else None
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [(r, executor.submit(fetch_with_retry, provider, *r, limiter=limiter, retries=retries))
+                   for r in ranges]
+
+    frames = [stored]
+    failures = []
+    for (instrument, range_start, range_end), future in futures:
+        try:
+            frames.append(future.result())
+        except Exception as e:
+            failures.append((instrument, range_start, range_end, repr(e)))
+
+    frames = [f for f in frames if len(f)]
+    data = pd.concat(frames, ignore_index=True) if frames else stored
+    data = data[data['Instrument'].isin(instruments) & (data['Date'] >= pd.Timestamp(start_date))]
+    data = data.drop_duplicates(subset=['Date', 'Instrument'], keep='first')
+
+    # Keep the instruments in the order they were requested, each in date order
+    order = {instrument: i for i, instrument in enumerate(instruments)}
+    data = data.sort_values(['Instrument', 'Date'], kind='stable',
+                            key=lambda c: c.map(order) if c.name == 'Instrument' else c)
+    data = data.reset_index(drop=True)
+    return data, failures
@@ -0,0 +1,124 @@
+import cProfile
+import json
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Off unless PIPELINE_PROFILE=1. PIPELINE_TRACEMALLOC=1 adds the top allocators per stage,
+# PIPELINE_CPROFILE=1 dumps a cProfile of the whole run to <script>.prof, and
+# PIPELINE_RUN_LOG picks the JSON-lines file the stage records are appended to.
+ENABLED = os.environ.get('PIPELINE_PROFILE', '0') not in ('', '0')
+TRACEMALLOC = ENABLED and os.environ.get('PIPELINE_TRACEMALLOC', '0') not in ('', '0')
+CPROFILE = os.environ.get('PIPELINE_CPROFILE', '0') not in ('', '0')
+RUN_LOG = os.environ.get('PIPELINE_RUN_LOG', 'run_log.jsonl')
+
+_run = {'id': None, 'script': None}
+
+
+class _NullStage:
+    """Stand-in returned by stage() when instrumentation is off."""
+
+    def count(self, name, value=1):
+        pass
+
+    def record(self, name, value):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, name):
+        self.name = name
+        self.counters = {}
+        self.values = {}
+
+    def count(self, name, value=1):
+        """Add value to a per-stage counter."""
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def record(self, name, value):
+        """Attach a JSON-serializable value (e.g. a per-date list) to the stage record."""
+        self.values[name] = value
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _write(record):
+    with open(RUN_LOG, 'a') as f:
+        f.write(json.dumps(record, default=float) + '\n')
+
+
+@contextmanager
+def stage(name):
+    """Time a pipeline stage and append wall time, CPU time, peak RSS and counters to the run log.
+
+    Yields an object with count()/record() for per-iteration counters. When instrumentation
+    is off this yields a shared no-op object and records nothing.
+    """
+    if not ENABLED:
+        yield _NULL_STAGE
+        return
+
+    current = _Stage(name)
+    # Nested stages share the trace started by the outermost one
+    started = TRACEMALLOC and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    if TRACEMALLOC:
+        before = tracemalloc.take_snapshot()
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield current
+    finally:
+        record = {
+            'run_id': _run['id'],
+            'script': _run['script'],
+            'stage': name,
+            'wall_seconds': time.perf_counter() - wall,
+            'cpu_seconds': time.process_time() - cpu,
+            'peak_rss_mb': peak_rss_mb(),
+            'counters': current.counters,
+        }
+        record.update(current.values)
+        if TRACEMALLOC:
+            stats = tracemalloc.take_snapshot().compare_to(before, 'lineno')[:10]
+            record['tracemalloc_peak_mb'] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            record['top_allocators'] = [{'where': str(s.traceback), 'size_kb': s.size_diff / 1024, 'count': s.count_diff}
+                                        for s in stats]
+        if started:
+            tracemalloc.stop()
+        _write(record)
+
+
+@contextmanager
+def run(script):
+    """Label the stages of one script run, and profile the whole run when PIPELINE_CPROFILE is set."""
+    _run['id'] = uuid.uuid4().hex[:12]
+    _run['script'] = script
+    profiler = cProfile.Profile() if CPROFILE else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        with stage('total'):
+            yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(script + '.prof')
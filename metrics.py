@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import rankdata
+
+
+def roc_auc(y_true, scores):
+    """Rank-based ROC AUC of every column at once, with samples along axis -2.
+
+    Ties get midranks, so this equals roc_auc_score column by column. Columns whose
+    y_true has a single class have no AUC and come back as NaN.
+    """
+    y_true = np.asarray(y_true, dtype=float)
+    ranks = rankdata(np.asarray(scores, dtype=float), axis=-2)
+    positives = y_true.sum(axis=-2)
+    negatives = y_true.shape[-2] - positives
+    with np.errstate(invalid='ignore', divide='ignore'):
+        auc = ((ranks * y_true).sum(axis=-2) - positives * (positives + 1) / 2) / (positives * negatives)
+    return np.where((positives == 0) | (negatives == 0), np.nan, auc)
+
+
+def evaluate(y_true, y_pred, tickers):
+    """Per-ticker AUC and accuracy table for (samples x tickers) labels and 0/1 predictions.
+
+    Columns: auc, accuracy, positives, negatives and degenerate (True where the labels
+    have a single class, so there is no AUC).
+    """
+    y_true = np.asarray(y_true, dtype=float)
+    y_pred = np.asarray(y_pred, dtype=float)
+    positives = y_true.sum(axis=0)
+    results = pd.DataFrame({
+        'auc': roc_auc(y_true, y_pred),
+        'accuracy': (y_true == y_pred).mean(axis=0),
+        'positives': positives.astype(int),
+        'negatives': (len(y_true) - positives).astype(int),
+    }, index=pd.Index(tickers, name='ticker'))
+    results['degenerate'] = (results['positives'] == 0) | (results['negatives'] == 0)
+    return results
@@ -0,0 +1,98 @@
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Saved inclusion models: one .npz holding the stacked (features x tickers) coefficients, the
+# intercepts, the feature scaling, the feature and ticker order and the decision cutoff. Scoring
+# folds the scaling into the coefficients, so labels for any number of rows are one matrix
+# multiply, and needs only numpy.
+# Usage: python model_artifact.py inclusion_model.npz new_features.csv [predictions.csv]
+
+# Bump when the saved fields change; load_model refuses artifacts from a newer format
+FORMAT_VERSION = 1
+
+
+class InclusionModel:
+    """Per-ticker linear inclusion models sharing one feature vector."""
+
+    def __init__(self, coef, intercept, x_mean, x_scale, features, tickers, cutoff=0.1, label_shift=1,
+                 trained_through=''):
+        self.coef = np.asarray(coef, dtype=float)
+        self.intercept = np.asarray(intercept, dtype=float)
+        self.x_mean = np.asarray(x_mean, dtype=float)
+        self.x_scale = np.asarray(x_scale, dtype=float)
+        self.features = [str(f) for f in features]
+        self.tickers = [str(t) for t in tickers]
+        self.cutoff = float(cutoff)
+        self.label_shift = int(label_shift)
+        self.trained_through = str(trained_through)
+
+        if self.coef.shape != (len(self.features), len(self.tickers)):
+            raise ValueError(f"coef has shape {self.coef.shape}, expected "
+                             f"({len(self.features)} features, {len(self.tickers)} tickers)")
+        if (self.intercept.shape != (len(self.tickers),) or self.x_mean.shape != (len(self.features),)
+                or self.x_scale.shape != (len(self.features),)):
+            raise ValueError("intercept, x_mean and x_scale do not match the feature and ticker counts")
+
+        # (x - mean) / scale @ coef + intercept == x @ weights + offset
+        self.weights = self.coef / self.x_scale[:, None]
+        self.offset = self.intercept - (self.x_mean / self.x_scale) @ self.coef
+
+    def scores(self, X):
+        """Raw predictions for a (rows x features) array, or a single row, in self.features order."""
+        return np.asarray(X, dtype=float) @ self.weights + self.offset
+
+    def labels(self, X):
+        """1 where a ticker's prediction is at least the cutoff, else 0."""
+        return (self.scores(X) >= self.cutoff).astype(float)
+
+    def feature_matrix(self, frame):
+        """The model's feature columns of a DataFrame (or Series for one row) in training order."""
+        columns = frame.index if isinstance(frame, pd.Series) else frame.columns
+        missing = [f for f in self.features if f not in columns]
+        if missing:
+            raise ValueError(f"Missing features the model was trained on: {', '.join(missing)}")
+        return frame[self.features].to_numpy(dtype=float)
+
+    def predict_frame(self, frame):
+        """Labels for every row of a feature DataFrame, as a date x ticker DataFrame."""
+        return pd.DataFrame(self.labels(self.feature_matrix(frame)), index=frame.index, columns=self.tickers)
+
+
+def save_model(path, coef, intercept, x_mean, x_scale, features, tickers, cutoff=0.1, label_shift=1,
+               trained_through=''):
+    """Write a model artifact. label_shift=1 means rows predict the next date's inclusion, 0 the same date's."""
+    model = InclusionModel(coef, intercept, x_mean, x_scale, features, tickers, cutoff, label_shift, trained_through)
+    np.savez(path, version=FORMAT_VERSION, coef=model.coef, intercept=model.intercept, x_mean=model.x_mean,
+             x_scale=model.x_scale, features=np.asarray(model.features, dtype=str),
+             tickers=np.asarray(model.tickers, dtype=str), cutoff=model.cutoff, label_shift=model.label_shift,
+             trained_through=model.trained_through)
+    return model
+
+
+def load_model(path='inclusion_model.npz'):
+    """Read a model artifact written by save_model."""
+    with np.load(path) as saved:
+        version = int(saved['version']) if 'version' in saved.files else 1
+        if version > FORMAT_VERSION:
+            raise ValueError(f"{path} has model format {version}; this code reads up to {FORMAT_VERSION}")
+        return InclusionModel(saved['coef'], saved['intercept'], saved['x_mean'], saved['x_scale'],
+                              saved['features'], saved['tickers'], float(saved['cutoff']),
+                              int(saved['label_shift']) if 'label_shift' in saved.files else 1,
+                              str(saved['trained_through']) if 'trained_through' in saved.files else '')
+
+
+if __name__ == '__main__':
+    start = time.perf_counter()
+    model = load_model(sys.argv[1])
+    loaded = time.perf_counter()
+    features = pd.read_csv(sys.argv[2], index_col=0)
+    predictions = model.predict_frame(features)
+    scored = time.perf_counter()
+
+    output = sys.argv[3] if len(sys.argv) > 3 else 'inclusion_predictions.csv'
+    predictions.to_csv(output)
+    print(f"Loaded {len(model.tickers)} ticker models in {(loaded - start) * 1000:.1f}ms, scored {len(features)} "
+          f"row(s) in {(scored - loaded) * 1000:.2f}ms, saved to {output}")
@@ -0,0 +1,171 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from backtest import TRADING_DAYS, align
+from feature_labels import read_weights
+from instrumentation import run, stage
+from price_store import load_prices
+from rolling_stats import simple_returns
+
+# Block-bootstrap stress test of the daily weights: every simulated path replays the weight
+# schedule against historical return rows drawn in blocks of consecutive days (keeping
+# cross-asset and short-range serial dependence), and reports VaR/CVaR, drawdown and realized
+# Sharpe distributions over the paths. Returns are before transaction costs (see backtest.py).
+# Usage: python monte_carlo.py [--paths 100000] [--block 10] [--seed 0] [--chunk 5000] [--workers 4]
+
+risk_free_rate = 0.0463
+LEVELS = (0.95, 0.99)
+
+# Per-path statistics returned by simulate, one column each
+PATH_STATS = ['total_return', 'annual_return', 'annual_vol', 'sharpe', 'max_drawdown', 'worst_day']
+
+# Day x historical-row portfolio returns, set in each worker by _init
+_payoffs = {}
+
+
+def payoff_matrix(weights, returns):
+    """(days x historical rows) matrix of every day's held weights applied to every historical return row.
+
+    Day t holds the weights chosen on date t - 1, so a path that draws historical row s
+    on day t earns payoffs[t, s]. One matrix product here replaces a per-path product
+    later: simulating a path is then just a gather from this matrix.
+    """
+    return weights[:-1] @ returns[1:].T
+
+
+def bootstrap_indices(rng, num_paths, num_days, num_rows, block_length):
+    """(paths x days) historical row indices from circular blocks of block_length consecutive rows."""
+    num_blocks = -(-num_days // block_length)
+    starts = rng.integers(0, num_rows, size=(num_paths, num_blocks, 1))
+    rows = (starts + np.arange(block_length)) % num_rows
+    return rows.reshape(num_paths, -1)[:, :num_days]
+
+
+def path_stats(path_returns, risk_free_rate=risk_free_rate):
+    """PATH_STATS for every row of a (paths x days) array of daily portfolio returns."""
+    num_days = path_returns.shape[1]
+    equity = np.cumprod(1.0 + path_returns, axis=1)
+    total = equity[:, -1] - 1.0
+    vol = path_returns.std(axis=1, ddof=1) * np.sqrt(TRADING_DAYS)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sharpe = (path_returns.mean(axis=1) * TRADING_DAYS - risk_free_rate) / vol
+    drawdown = (equity / np.maximum.accumulate(equity, axis=1) - 1.0).min(axis=1)
+    return np.column_stack([total, (1.0 + total) ** (TRADING_DAYS / num_days) - 1.0, vol, sharpe, drawdown,
+                            path_returns.min(axis=1)])
+
+
+def _init(payoffs):
+    _payoffs['M'] = payoffs
+
+
+def simulate_chunk(seed, num_paths, block_length, payoffs=None, risk_free_rate=risk_free_rate):
+    """Simulate one chunk of paths; returns (paths x PATH_STATS) and how often each payoff entry was drawn.
+
+    Memory is bounded by num_paths x days for the indices and returns of this chunk only.
+    """
+    payoffs = _payoffs['M'] if payoffs is None else payoffs
+    num_days, num_rows = payoffs.shape
+    rows = bootstrap_indices(np.random.default_rng(seed), num_paths, num_days, num_rows, block_length)
+    path_returns = payoffs[np.arange(num_days), rows]
+    counts = np.bincount((np.arange(num_days) * num_rows + rows).ravel(), minlength=payoffs.size)
+    return path_stats(path_returns, risk_free_rate), counts
+
+
+def simulate(weights, returns, num_paths=10000, block_length=10, seed=0, chunk_size=5000, workers=1,
+             risk_free_rate=risk_free_rate):
+    """Bootstrap num_paths return paths and evaluate the weight schedule on each.
+
+    weights is (days x assets) and returns the matching (days x assets) simple returns
+    (row 0 unused). Paths are simulated chunk_size at a time, each chunk with its own
+    child of SeedSequence(seed), so the result depends on seed and chunk_size but not on
+    workers. Returns (DataFrame of PATH_STATS per path, payoff matrix, counts of how often
+    each payoff entry was drawn, for the pooled daily return distribution).
+    """
+    payoffs = payoff_matrix(np.asarray(weights, dtype=float), np.nan_to_num(np.asarray(returns, dtype=float)))
+    sizes = [min(chunk_size, num_paths - start) for start in range(0, num_paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    stats = []
+    counts = np.zeros(payoffs.size, dtype=np.int64)
+
+    def collect(results):
+        # Chunk results are folded in as they arrive so only per-path statistics are kept
+        for chunk_stats, chunk_counts in results:
+            stats.append(chunk_stats)
+            np.add(counts, chunk_counts, out=counts)
+
+    if workers == 1:
+        collect(simulate_chunk(s, n, block_length, payoffs, risk_free_rate) for s, n in zip(seeds, sizes))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init, initargs=(payoffs,)) as executor:
+            collect(executor.map(simulate_chunk, seeds, sizes, [block_length] * len(sizes), [None] * len(sizes),
+                                 [risk_free_rate] * len(sizes)))
+
+    stats = pd.DataFrame(np.vstack(stats), columns=PATH_STATS)
+    stats.index.name = 'path'
+    return stats, payoffs, counts.reshape(payoffs.shape)
+
+
+def var_cvar(values, level, counts=None):
+    """Value at risk and conditional value at risk (expected shortfall) of returns, as positive losses.
+
+    counts optionally weights each value by how many times it occurs.
+    """
+    values = np.ravel(values)
+    counts = np.ones(len(values)) if counts is None else np.ravel(counts).astype(float)
+    order = np.argsort(values)
+    values, counts = values[order], counts[order]
+    cumulative = np.cumsum(counts)
+    tail = (1.0 - level) * cumulative[-1]
+    cutoff = np.searchsorted(cumulative, tail)
+    # Expected loss over exactly the worst (1 - level) share, splitting the boundary value
+    in_tail = np.minimum(counts, np.maximum(tail - (cumulative - counts), 0.0))
+    return -values[cutoff], -np.sum(values * in_tail) / tail
+
+
+def risk_report(stats, payoffs, counts, levels=LEVELS):
+    """VaR/CVaR of daily and horizon returns, drawdown and Sharpe percentiles as a metric -> value Series."""
+    report = {}
+    for level in levels:
+        pct = f'{level * 100:g}'
+        report[f'daily_var_{pct}'], report[f'daily_cvar_{pct}'] = var_cvar(payoffs, level, counts)
+        report[f'horizon_var_{pct}'], report[f'horizon_cvar_{pct}'] = var_cvar(stats['total_return'].to_numpy(), level)
+    for q in (5, 50, 95):
+        report[f'max_drawdown_p{q}'] = np.percentile(stats['max_drawdown'], q)
+    for q in (5, 25, 50, 75, 95):
+        report[f'sharpe_p{q}'] = np.nanpercentile(stats['sharpe'], q)
+    report['sharpe_std'] = stats['sharpe'].std()
+    report['prob_loss'] = (stats['total_return'] < 0).mean()
+    return pd.Series(report, name='value').rename_axis('metric')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Block-bootstrap Monte Carlo risk report for the daily weights.')
+    parser.add_argument('--weights', default='optimized_portfolio_weights_daily.csv')
+    parser.add_argument('--paths', type=int, default=10000)
+    parser.add_argument('--block', type=int, default=10, help='consecutive historical days per bootstrap block')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk', type=int, default=5000, help='paths simulated at a time; bounds memory')
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+
+    with run('monte_carlo'):
+        with stage('load'):
+            dates, weights, prices = align(read_weights(args.weights), load_prices('dividend_data.csv'))
+
+        with stage('simulate') as st:
+            stats, payoffs, counts = simulate(weights[0], simple_returns(prices), num_paths=args.paths,
+                                              block_length=args.block, seed=args.seed, chunk_size=args.chunk,
+                                              workers=args.workers)
+            st.count('paths', args.paths)
+            st.count('days', payoffs.shape[0])
+
+        report = risk_report(stats, payoffs, counts)
+        report.to_csv('monte_carlo_summary.csv')
+        stats.to_csv('monte_carlo_paths.csv')
+
+    print(report.to_string())
+    print("Summary saved to monte_carlo_summary.csv, per-path statistics to monte_carlo_paths.csv")
@@ -0,0 +1,169 @@
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from price_store import file_hash
+
+# Runs the scripts as a dependency graph over their input/output artifacts, skipping stages
+# whose inputs and code have not changed since their last successful run.
+# Usage: python pipeline.py [--refresh] [--force STAGE ...] [--workers N] [--dry-run]
+
+# source=True marks stages that pull external data; they only run when their outputs are
+# missing or --refresh is given, so an offline checkout with the CSVs never calls them.
+# Derived files such as the binary price store get their own stage built from those CSVs.
+# A stage's code dependencies are the repo modules its script imports, directly or not.
+Stage = namedtuple('Stage', ['name', 'script', 'inputs', 'outputs', 'source'])
+
+STAGES = [
+    Stage('get_data', 'getData.py', [], ['dividend_data.csv'], True),
+    Stage('get_features', 'get_features.py', [], ['feature_data.csv'], True),
+    Stage('engineer_features', 'feature_engineering.py', ['feature_data.csv'], ['engineered_features.csv'], False),
+    Stage('price_store', 'price_store.py', ['dividend_data.csv'], ['prices.npy', 'prices.json'], False),
+    Stage('optimize_daily', 'determinePortfolio_daily.py', ['dividend_data.csv', 'prices.json', 'feature_data.csv'],
+          ['optimized_portfolio_weights_daily.csv', 'solver_stats_daily.csv', 'covariances.json'], False),
+    Stage('train', 'train.py', ['optimized_portfolio_weights_daily.csv', 'feature_data.csv'], ['inclusion_model.npz'],
+          False),
+    Stage('train_no_future', 'trainNoFuture.py', ['optimized_portfolio_weights_daily.csv', 'feature_data.csv'],
+          ['noFutureOutput.txt', 'inclusion_model_no_future.npz'], False),
+    Stage('threshold_sweep', 'optimizer.py', ['optimized_portfolio_weights_daily.csv', 'feature_data.csv'],
+          ['threshold_evaluation_results.txt'], False),
+    Stage('walk_forward_cv', 'walk_forward_cv.py', ['optimized_portfolio_weights_daily.csv', 'feature_data.csv'],
+          ['walk_forward_folds.csv', 'walk_forward_summary.csv'], False),
+]
+
+STATE_FILE = '.pipeline_state.json'
+
+
+def local_imports(script):
+    """Repo modules a script imports, following their own imports; the script itself excluded.
+
+    Only top-level module names that exist as .py files next to the script count, so
+    third-party and standard-library imports are ignored.
+    """
+    directory = os.path.dirname(script)
+    found, queue = set(), [script]
+    while queue:
+        with open(queue.pop()) as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                path = os.path.join(directory, name.split('.')[0] + '.py')
+                if path != script and path not in found and os.path.exists(path):
+                    found.add(path)
+                    queue.append(path)
+    return sorted(found)
+
+
+def fingerprint(stage):
+    """Hash of a stage's script, the repo modules it imports and its input artifacts."""
+    digest = hashlib.sha256()
+    for path in [stage.script] + local_imports(stage.script) + stage.inputs:
+        digest.update(path.encode())
+        digest.update(file_hash(path).encode() if os.path.exists(path) else b'missing')
+    return digest.hexdigest()
+
+
+def is_up_to_date(stage, state, refresh=False):
+    """True when the stage can be skipped."""
+    if not all(os.path.exists(path) for path in stage.outputs):
+        return False
+    if stage.source:
+        return not refresh
+    return state.get(stage.name) == fingerprint(stage)
+
+
+def upstream(stage, stages):
+    """Names of the stages producing any of this stage's inputs."""
+    return {other.name for other in stages if set(other.outputs) & set(stage.inputs)}
+
+
+def load_state():
+    if not os.path.exists(STATE_FILE):
+        return {}
+    with open(STATE_FILE) as f:
+        return json.load(f)
+
+
+def save_state(state):
+    with open(STATE_FILE, 'w') as f:
+        json.dump(state, f, indent=2)
+
+
+def run_stage(stage):
+    """Run one stage's script in a subprocess and return (returncode, seconds)."""
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, stage.script])
+    return completed.returncode, time.perf_counter() - start
+
+
+def run_pipeline(stages=STAGES, workers=2, force=(), refresh=False, dry_run=False):
+    """Run every out-of-date stage once its upstream stages are done, independent stages in parallel.
+
+    A stage is out of date when it is forced, its outputs are missing, or the fingerprint of
+    its code and inputs differs from the one recorded after its last successful run. Stages
+    downstream of a failed stage are not run. Returns {stage name: status}.
+    """
+    state = load_state()
+    deps = {stage.name: upstream(stage, stages) for stage in stages}
+    status = {}
+    pending = list(stages)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while pending or running:
+            for stage in list(pending):
+                if any(status.get(d) in (None, 'running') for d in deps[stage.name]):
+                    continue
+                pending.remove(stage)
+                if any(status[d] in ('failed', 'blocked') for d in deps[stage.name]):
+                    status[stage.name] = 'blocked'
+                elif stage.name not in force and is_up_to_date(stage, state, refresh):
+                    status[stage.name] = 'skipped'
+                elif dry_run:
+                    status[stage.name] = 'would run'
+                else:
+                    status[stage.name] = 'running'
+                    print(f"[pipeline] running {stage.name} ({stage.script})")
+                    running[executor.submit(run_stage, stage)] = stage
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                returncode, seconds = future.result()
+                if returncode == 0:
+                    status[stage.name] = 'ran'
+                    state[stage.name] = fingerprint(stage)
+                    save_state(state)
+                else:
+                    status[stage.name] = 'failed'
+                print(f"[pipeline] {stage.name} {status[stage.name]} in {seconds:.2f}s")
+    return status
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Incremental runner for the data -> portfolio -> model scripts.')
+    parser.add_argument('--workers', type=int, default=2, help='stages run at the same time')
+    parser.add_argument('--force', nargs='*', default=[], help='stages to rerun even if up to date')
+    parser.add_argument('--refresh', action='store_true', help='also pull new market data')
+    parser.add_argument('--dry-run', action='store_true', help='only report what would run')
+    args = parser.parse_args()
+
+    status = run_pipeline(workers=args.workers, force=set(args.force), refresh=args.refresh, dry_run=args.dry_run)
+    for name, result in status.items():
+        print(f"{name}: {result}")
+    sys.exit(1 if 'failed' in status.values() else 0)
@@ -0,0 +1,81 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+def file_hash(path):
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def pivot_prices_csv(csv_path='dividend_data.csv'):
+    """Read the long-format price CSV and pivot it to a date x instrument close matrix."""
+    df = pd.read_csv(csv_path)
+    df['Date'] = pd.to_datetime(df['Date'])
+    df = df.drop_duplicates(subset=['Date', 'Instrument'], keep='first')
+    return df.pivot(index='Date', columns='Instrument', values='close')
+
+
+def write_price_store(df_pivot, store_path='prices', source_csv='dividend_data.csv'):
+    """Write df_pivot as store_path.npy plus a store_path.json index of dates and instruments.
+
+    The index records a hash of the matrix and of the source CSV so readers can check
+    the store is intact and up to date.
+    """
+    values = np.ascontiguousarray(df_pivot.to_numpy(dtype=np.float64))
+    np.save(store_path + '.npy', values)
+    index = {
+        'dates': [d.strftime('%Y-%m-%d') for d in df_pivot.index],
+        'instruments': list(df_pivot.columns),
+        'shape': list(values.shape),
+        'dtype': str(values.dtype),
+        'content_hash': hashlib.sha256(values.tobytes()).hexdigest(),
+        'source_hash': file_hash(source_csv) if source_csv and os.path.exists(source_csv) else None,
+    }
+    with open(store_path + '.json', 'w') as f:
+        json.dump(index, f)
+
+
+def load_price_store(store_path='prices', source_csv='dividend_data.csv', verify=False):
+    """Memory-map the price store as a DataFrame, or return None if it is missing or stale.
+
+    The store is stale when source_csv exists and no longer matches the recorded hash.
+    verify=True also re-hashes the matrix itself, which reads the whole file.
+    """
+    if not (os.path.exists(store_path + '.npy') and os.path.exists(store_path + '.json')):
+        return None
+    with open(store_path + '.json') as f:
+        index = json.load(f)
+    if source_csv and os.path.exists(source_csv) and file_hash(source_csv) != index['source_hash']:
+        return None
+
+    values = np.load(store_path + '.npy', mmap_mode='r')
+    if list(values.shape) != index['shape']:
+        return None
+    if verify and hashlib.sha256(values.tobytes()).hexdigest() != index['content_hash']:
+        return None
+
+    dates = pd.DatetimeIndex(pd.to_datetime(index['dates']), name='Date')
+    columns = pd.Index(index['instruments'], name='Instrument')
+    return pd.DataFrame(values, index=dates, columns=columns, copy=False)
+
+
+def load_prices(csv_path='dividend_data.csv', store_path='prices'):
+    """Wide close-price matrix from the binary store, falling back to pivoting the CSV."""
+    df_pivot = load_price_store(store_path, source_csv=csv_path)
+    if df_pivot is None:
+        df_pivot = pivot_prices_csv(csv_path)
+    return df_pivot
+
+
+if __name__ == '__main__':
+    # Rebuild the binary store from dividend_data.csv, e.g. after a fresh checkout
+    write_price_store(pivot_prices_csv('dividend_data.csv'), 'prices', source_csv='dividend_data.csv')
+    print("Price store saved to prices.npy and prices.json")
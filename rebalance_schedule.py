@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+
+def period_boundaries(index, freq='M'):
+    """Return (labels, starts, stops) row ranges of a sorted DatetimeIndex for each rebalance period.
+
+    freq is 'M' (calendar month), 'W' (calendar week ending Sunday) or an integer N for
+    blocks of N trading days. Calendar periods are labelled by their last calendar day,
+    N-day blocks by their last trading day. Built in one pass over the index.
+    """
+    num_rows = len(index)
+    if num_rows == 0:
+        return index[:0], np.array([], dtype=int), np.array([], dtype=int)
+    if isinstance(freq, (int, np.integer)):
+        starts = np.arange(0, num_rows, freq)
+        stops = np.minimum(starts + freq, num_rows)
+        return index[stops - 1], starts, stops
+
+    if freq == 'M':
+        keys = index.year * 12 + index.month
+    elif freq == 'W':
+        keys = (index.normalize() + pd.to_timedelta(6 - index.dayofweek, unit='D')).asi8
+    else:
+        raise ValueError(f"Unsupported rebalance frequency: {freq!r}")
+
+    keys = np.asarray(keys)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(keys)) + 1))
+    stops = np.append(starts[1:], num_rows)
+    labels = index[stops - 1].to_period(freq).end_time.normalize()
+    return labels, starts, stops
+
+
+def rebalance_windows(df_pivot, freq='M'):
+    """Yield (rebalance_date, window) where window is a row slice of df_pivot for that period."""
+    labels, starts, stops = period_boundaries(df_pivot.index, freq)
+    for date, start, stop in zip(labels, starts, stops):
+        yield date, df_pivot.iloc[start:stop]
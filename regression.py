@@ -0,0 +1,73 @@
+import numpy as np
+
+
+def add_intercept(X):
+    """Prepend a column of ones to X."""
+    X = np.atleast_2d(np.asarray(X, dtype=float))
+    return np.hstack([np.ones((X.shape[0], 1)), X])
+
+
+class RecursiveLeastSquares:
+    """Expanding-window least squares with intercept for many targets sharing one design matrix.
+
+    Starts from an exact fit on the initial rows and then absorbs one row at a time with a
+    Sherman-Morrison rank-1 update of (X'X)^-1, so every step costs O(k^2 + k * targets)
+    instead of refitting from scratch. Matches LinearRegression() fitted on the same rows.
+    """
+
+    def __init__(self, X, Y):
+        A = add_intercept(X)
+        Y = np.asarray(Y, dtype=float).reshape(len(A), -1)
+        self.P = np.linalg.inv(A.T @ A)
+        self.coef = self.P @ (A.T @ Y)
+
+    def update(self, x, y):
+        """Add one observation x (features) with targets y (one value per target)."""
+        a = add_intercept(x)[0]
+        Pa = self.P @ a
+        gain = Pa / (1.0 + a @ Pa)
+        self.coef += np.outer(gain, np.asarray(y, dtype=float) - a @ self.coef)
+        self.P -= np.outer(gain, Pa)
+
+    def predict(self, X):
+        """Predictions for every row of X and every target."""
+        return add_intercept(X) @ self.coef
+
+
+def expanding_predictions(X, Y, start, x_predict):
+    """Predict x_predict from models fit on X[:val], Y[:val] for every val from start to len(X) - 1.
+
+    Returns a (len(X) - start) x targets array, one row per expanding-window step.
+    """
+    model = RecursiveLeastSquares(X[:start], Y[:start])
+    predictions = np.empty((len(X) - start, model.coef.shape[1]))
+    for step, val in enumerate(range(start, len(X))):
+        if val > start:
+            model.update(X[val - 1], Y[val - 1])
+        predictions[step] = model.predict(x_predict)[0]
+    return predictions
+
+
+def fit_multi_target(X, Y):
+    """Least squares with intercept for every column of Y from a single factorization of X.
+
+    Equivalent to fitting LinearRegression() separately on each column. Returns the
+    (features x targets) coefficient matrix and the per-target intercepts.
+    """
+    X = np.asarray(X, dtype=float)
+    Y = np.asarray(Y, dtype=float).reshape(len(X), -1)
+    x_mean = X.mean(axis=0)
+    y_mean = Y.mean(axis=0)
+    coef = np.linalg.lstsq(X - x_mean, Y - y_mean, rcond=None)[0]
+    intercept = y_mean - x_mean @ coef
+    return coef, intercept
+
+
+def predict(X, coef, intercept):
+    """Predictions for every row of X and every target."""
+    return np.asarray(X, dtype=float) @ coef + intercept
+
+
+def to_labels(predictions, cutoff=0.1):
+    """1 where a prediction is at least cutoff, else 0."""
+    return (predictions >= cutoff).astype(float)
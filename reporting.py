@@ -0,0 +1,52 @@
+import numpy as np
+
+
+def roc_curves(y_true, scores):
+    """(fpr, tpr) arrays for every column of (samples x tickers) labels and scores."""
+    y_true = np.asarray(y_true, dtype=float)
+    scores = np.asarray(scores, dtype=float)
+    order = np.argsort(-scores, axis=0, kind='stable')
+    sorted_true = np.take_along_axis(y_true, order, axis=0)
+    sorted_scores = np.take_along_axis(scores, order, axis=0)
+    tps = np.cumsum(sorted_true, axis=0)
+    fps = np.cumsum(1 - sorted_true, axis=0)
+
+    curves = []
+    for j in range(y_true.shape[1]):
+        # Keep one point per distinct score, as roc_curve does
+        last = np.append(np.flatnonzero(np.diff(sorted_scores[:, j])), len(scores) - 1)
+        tp = np.concatenate(([0], tps[last, j]))
+        fp = np.concatenate(([0], fps[last, j]))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            curves.append((fp / fp[-1], tp / tp[-1]))
+    return curves
+
+
+def save_roc_grid(y_true, scores, results, path):
+    """Draw every ticker's ROC curve as one panel of a single figure and save it to path.
+
+    results is the metrics.evaluate table; degenerate tickers get an empty panel.
+    matplotlib is only imported here, so runs without reporting never load it.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    tickers = list(results.index)
+    curves = roc_curves(y_true, scores)
+    cols = int(np.ceil(np.sqrt(len(tickers))))
+    rows = int(np.ceil(len(tickers) / cols))
+    fig, axes = plt.subplots(rows, cols, figsize=(2 * cols, 2 * rows), sharex=True, sharey=True, squeeze=False)
+    for ax, ticker, (fpr, tpr) in zip(axes.flat, tickers, curves):
+        ax.plot([0, 1], [0, 1], color='grey', linewidth=0.5, linestyle='--')
+        if not results.loc[ticker, 'degenerate']:
+            ax.plot(fpr, tpr, linewidth=1)
+            ax.set_title(f"{ticker} {results.loc[ticker, 'auc']:.2f}", fontsize=7)
+        else:
+            ax.set_title(f"{ticker} n/a", fontsize=7)
+        ax.tick_params(labelsize=5)
+    for ax in axes.flat[len(tickers):]:
+        ax.axis('off')
+    fig.tight_layout()
+    fig.savefig(path, dpi=100)
+    plt.close(fig)
@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+
+
+class RollingMoments:
+    """Pairwise-complete running sums for a window of return rows."""
+
+    def __init__(self, num_assets):
+        self.count = np.zeros((num_assets, num_assets))
+        self.sums = np.zeros((num_assets, num_assets))
+        self.cross = np.zeros((num_assets, num_assets))
+
+    def reset(self, rows):
+        """Rebuild the sums from scratch for a block of return rows."""
+        valid = ~np.isnan(rows)
+        filled = np.where(valid, rows, 0.0)
+        mask = valid.astype(float)
+        self.count = mask.T @ mask
+        self.sums = filled.T @ mask
+        self.cross = filled.T @ filled
+
+    def add(self, row, sign=1.0):
+        """Add one return row to the window (or remove it with sign=-1)."""
+        valid = ~np.isnan(row)
+        filled = np.where(valid, row, 0.0)
+        mask = valid.astype(float)
+        self.count += sign * np.outer(mask, mask)
+        self.sums += sign * np.outer(filled, mask)
+        self.cross += sign * np.outer(filled, filled)
+
+    def remove(self, row):
+        """Drop one return row from the window."""
+        self.add(row, sign=-1.0)
+
+    def mean(self):
+        """Column means over non-missing rows, as DataFrame.mean() does."""
+        n = np.diag(self.count)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(n > 0, np.diag(self.sums) / n, np.nan)
+
+    def cov(self):
+        """Pairwise-complete sample covariance, as DataFrame.cov() does."""
+        n = self.count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = (self.cross - self.sums * self.sums.T / n) / (n - 1)
+        cov[n < 2] = np.nan
+        return cov
+
+
+def rolling_sum(x, window, axis=0):
+    """Sum over the trailing `window` entries along an axis, from one cumulative sum.
+
+    Entries whose window is not full or contains a NaN are NaN.
+    """
+    x = np.moveaxis(np.asarray(x, dtype=float), axis, 0)
+    valid = ~np.isnan(x)
+    sums = np.zeros((len(x) + 1,) + x.shape[1:])
+    counts = np.zeros((len(x) + 1,) + x.shape[1:])
+    np.cumsum(np.where(valid, x, 0.0), axis=0, out=sums[1:])
+    np.cumsum(valid, axis=0, out=counts[1:])
+    out = np.full(x.shape, np.nan)
+    out[window - 1:] = np.where(counts[window:] - counts[:-window] == window, sums[window:] - sums[:-window], np.nan)
+    return np.moveaxis(out, 0, axis)
+
+
+def rolling_mean_std(x, window, axis=0):
+    """Trailing mean and sample standard deviation along an axis."""
+    mean = rolling_sum(x, window, axis) / window
+    var = (rolling_sum(x ** 2, window, axis) - window * mean ** 2) / (window - 1)
+    return mean, np.sqrt(np.maximum(var, 0.0))
+
+
+def simple_returns(prices):
+    """Row t holds the return from row t-1 to row t, NaN if either price is missing."""
+    returns = np.full(prices.shape, np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns[1:] = prices[1:] / prices[:-1] - 1.0
+    return returns
+
+
+def window_first_rows(dates, lookback_days):
+    """Row of the first date inside each date's lookback slice.
+
+    That row has no previous price inside the slice, so the window's returns are
+    rows (first_row, date_row].
+    """
+    return dates.searchsorted(dates - pd.DateOffset(lookback_days), side='left')
+
+
+def rolling_windows(df_pivot, lookback_days=30, start=30, stop=None):
+    """Yield (date, return rows) for each date in df_pivot[start:stop], the rows rolling_moments averages over."""
+    dates = df_pivot.index
+    returns = simple_returns(df_pivot.to_numpy(dtype=float))
+    first_rows = window_first_rows(dates, lookback_days)
+    stop = len(dates) if stop is None else stop
+    for pos in range(start, stop):
+        yield dates[pos], returns[first_rows[pos] + 1:pos + 1]
+
+
+def rolling_moments(df_pivot, lookback_days=30, start=30, stop=None, refresh=50):
+    """Yield (date, mean_returns, cov_matrix) for each date in df_pivot[start:stop].
+
+    Matches df_pivot.loc[date - pd.DateOffset(lookback_days):date].pct_change(fill_method=None)
+    followed by .mean() and .cov(). Returns are computed once; the window sums are then
+    updated as rows enter and leave, and rebuilt from scratch every `refresh` dates so
+    rounding error cannot accumulate.
+    """
+    dates = df_pivot.index
+    returns = simple_returns(df_pivot.to_numpy(dtype=float))
+    first_rows = window_first_rows(dates, lookback_days)
+
+    stop = len(dates) if stop is None else stop
+    window = RollingMoments(returns.shape[1])
+    lo = hi = None
+    for step, pos in enumerate(range(start, stop)):
+        new_lo, new_hi = first_rows[pos] + 1, pos + 1
+        if step % refresh == 0:
+            window.reset(returns[new_lo:new_hi])
+        else:
+            for row in range(hi, new_hi):
+                window.add(returns[row])
+            for row in range(lo, new_lo):
+                window.remove(returns[row])
+        lo, hi = new_lo, new_hi
+        yield dates[pos], window.mean(), window.cov()
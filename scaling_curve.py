@@ -0,0 +1,31 @@
+import os
+import sys
+import time
+
+from daily_optimizer import optimize_daily
+from price_store import load_prices
+
+# Measures the daily backtest's wall time from 1 to N worker processes and checks that
+# every run writes the same weights as the single-process run.
+# Usage: python scaling_curve.py [max_workers]
+risk_free_rate = 0.0463
+max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count()
+
+if __name__ == '__main__':
+    df_pivot = load_prices('dividend_data.csv')
+
+    baseline = None
+    with open('scaling_curve.txt', 'w') as file:
+        file.write(f"{len(df_pivot) - 30} dates, {df_pivot.shape[1]} assets, {os.cpu_count()} cores\n")
+        for workers in range(1, max_workers + 1):
+            start = time.perf_counter()
+            weights_df, stats_df = optimize_daily(df_pivot, risk_free_rate, workers=workers)
+            seconds = time.perf_counter() - start
+            if baseline is None:
+                baseline = (weights_df, seconds)
+            identical = weights_df.equals(baseline[0])
+            file.write(f"Workers: {workers}, Time: {seconds:.2f}s, Speedup: {baseline[1] / seconds:.2f}x, "
+                       f"Identical: {identical}\n")
+            print(f"{workers} worker(s): {seconds:.2f}s")
+
+    print("Scaling results saved to scaling_curve.txt")
@@ -0,0 +1,80 @@
+import time
+
+import numpy as np
+from scipy.optimize import minimize
+
+from covariance import FactorCovariance
+
+
+def get_annualized_performance(weights, mean_returns, cov_matrix):
+    """Calculate annualized performance for a portfolio.
+
+    cov_matrix only needs a .dot(), so a FactorCovariance is evaluated in factored form.
+    """
+    returns = np.sum(mean_returns * weights) * 252
+    std_dev = np.sqrt(np.dot(weights.T, cov_matrix.dot(weights))) * np.sqrt(252)
+    return std_dev, returns
+
+
+def negative_sharpe_ratio(weights, mean_returns, cov_matrix, risk_free_rate):
+    """Calculate the negative Sharpe ratio for a portfolio."""
+    p_std_dev, p_return = get_annualized_performance(weights, mean_returns, cov_matrix)
+    return -(p_return - risk_free_rate) / p_std_dev
+
+
+def negative_sharpe_ratio_and_grad(weights, mean_returns, cov_matrix, risk_free_rate):
+    """Negative Sharpe ratio together with its exact gradient."""
+    cov_w = cov_matrix.dot(weights)
+    variance = np.dot(weights, cov_w)
+    std_dev = np.sqrt(variance * 252)
+    excess = np.dot(mean_returns, weights) * 252 - risk_free_rate
+    value = -excess / std_dev
+    grad = -252 * mean_returns / std_dev + excess * 252 * cov_w / std_dev ** 3
+    return value, grad
+
+
+def _sum_to_one(x):
+    return np.sum(x) - 1.0
+
+
+def _sum_to_one_jac(x):
+    return np.ones_like(x)
+
+
+def solve_max_sharpe(mean_returns, cov_matrix, risk_free_rate, x0=None, analytic=True):
+    """Long-only max-Sharpe weights via SLSQP.
+
+    With analytic=True the objective and the sum-to-one constraint are given exact
+    Jacobians; otherwise SLSQP falls back to finite differences as before. x0 is the
+    starting point (e.g. the previous date's weights) and defaults to equal weights.
+    cov_matrix may be a FactorCovariance; its objective calls are O(n*k), but SLSQP's
+    own dense subproblem dominates the solve time either way.
+    Returns the weights and a dict with iterations, evaluations and wall time.
+    """
+    mean_returns = np.asarray(mean_returns, dtype=float)
+    if not isinstance(cov_matrix, FactorCovariance):
+        cov_matrix = np.asarray(cov_matrix, dtype=float)
+    num_assets = len(mean_returns)
+    if x0 is None:
+        x0 = np.full(num_assets, 1. / num_assets)
+    args = (mean_returns, cov_matrix, risk_free_rate)
+    bounds = tuple((0.0, 1.0) for asset in range(num_assets))
+
+    start = time.perf_counter()
+    if analytic:
+        constraints = ({'type': 'eq', 'fun': _sum_to_one, 'jac': _sum_to_one_jac})
+        result = minimize(negative_sharpe_ratio_and_grad, x0, args=args, jac=True,
+                          method='SLSQP', constraints=constraints, bounds=bounds)
+    else:
+        constraints = ({'type': 'eq', 'fun': _sum_to_one})
+        result = minimize(negative_sharpe_ratio, x0, args=args, constraints=constraints, bounds=bounds)
+    seconds = time.perf_counter() - start
+
+    stats = {
+        'nit': result.get('nit', 0),
+        'nfev': result.get('nfev', 0),
+        'njev': result.get('njev', 0),
+        'seconds': seconds,
+        'success': bool(result['success']),
+    }
+    return result['x'], stats
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The modules are flat scripts in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def prices():
+    """Business-day closes for a handful of assets, with gaps like the real price matrix."""
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range('2020-01-01', periods=160)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0.0005, 0.01, size=(len(dates), 6)), axis=0))
+    frame = pd.DataFrame(closes, index=dates, columns=[f'A{i}.N' for i in range(6)])
+    frame.iloc[5:9, 1] = np.nan
+    frame.iloc[40, 3] = np.nan
+    frame.iloc[:25, 5] = np.nan
+    return frame
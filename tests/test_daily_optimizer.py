@@ -0,0 +1,13 @@
+import numpy as np
+
+from daily_optimizer import optimize_daily
+
+
+def test_weights_do_not_depend_on_worker_count(prices):
+    prices = prices.ffill().bfill()
+    results = [optimize_daily(prices, 0.0463, workers=workers, block_size=20) for workers in (1, 2, 3)]
+    serial_weights, serial_stats = results[0]
+    for weights, stats in results[1:]:
+        assert weights.index.equals(serial_weights.index)
+        np.testing.assert_array_equal(weights.to_numpy(), serial_weights.to_numpy())
+        np.testing.assert_array_equal(stats['nit'].to_numpy(), serial_stats['nit'].to_numpy())
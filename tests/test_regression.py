@@ -0,0 +1,35 @@
+import numpy as np
+
+from feature_labels import build_dataset
+from regression import expanding_predictions, fit_multi_target, predict
+
+
+def test_expanding_predictions_match_refits():
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(80, 5))
+    Y = (X @ rng.normal(size=(5, 4)) + rng.normal(size=(80, 4)) > 0).astype(float)
+    x_predict = rng.normal(size=(1, 5))
+
+    predictions = expanding_predictions(X, Y, 40, x_predict)
+    refits = np.vstack([predict(x_predict, *fit_multi_target(X[:val], Y[:val])) for val in range(40, 80)])
+    np.testing.assert_allclose(predictions, refits, atol=1e-9)
+
+
+def test_cached_dataset_matches_rebuild(prices, tmp_path):
+    weights = prices.notna().astype(float) / 6
+    weights.index = weights.index.strftime('%Y-%m-%d')
+    features = prices.ffill().bfill().rename(columns=lambda c: 'F' + c)
+    features.index = weights.index
+    features.index.name = 'Date'
+    weights.to_csv(tmp_path / 'weights.csv')
+    features.to_csv(tmp_path / 'features.csv')
+
+    def build(cache_dir):
+        return build_dataset(['FA0.N', 'FA2.N', 'FA4.N'], 0.1, weights_csv=str(tmp_path / 'weights.csv'),
+                             features_csv=str(tmp_path / 'features.csv'), cache_dir=str(cache_dir), export_csv=False)
+
+    built = build(tmp_path / 'cache')
+    cached = build(tmp_path / 'cache')
+    rebuilt = build(tmp_path / 'fresh')
+    for field in built._fields:
+        np.testing.assert_array_equal(getattr(cached, field), getattr(rebuilt, field))
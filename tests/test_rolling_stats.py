@@ -0,0 +1,12 @@
+import numpy as np
+import pandas as pd
+
+from rolling_stats import rolling_moments
+
+
+def test_rolling_moments_match_pandas(prices):
+    # refresh=7 makes most dates come from the add/remove updates rather than a rebuild
+    for date, mean, cov in rolling_moments(prices, lookback_days=30, start=30, refresh=7):
+        returns = prices.loc[date - pd.DateOffset(30):date].pct_change(fill_method=None)
+        np.testing.assert_allclose(mean, returns.mean().to_numpy(), rtol=1e-9, atol=1e-12)
+        np.testing.assert_allclose(cov, returns.cov().to_numpy(), rtol=1e-7, atol=1e-12)
@@ -0,0 +1,50 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from feature_labels import split_indices, standardize
+from metrics import roc_auc
+
+
+def _sweep_block(solver, X_valid_centered, W_train, W_valid, thresholds, cutoff):
+    """(thresholds x tickers) AUCs for one block of thresholds."""
+    # Label tensors are (thresholds x dates x tickers)
+    Y_train = (W_train[None] >= thresholds[:, None, None]).astype(float)
+    Y_valid = (W_valid[None] >= thresholds[:, None, None]).astype(float)
+    y_mean = Y_train.mean(axis=1, keepdims=True)
+    coef = np.einsum('kn,tnj->tkj', solver, Y_train - y_mean)
+    predictions = np.einsum('nk,tkj->tnj', X_valid_centered, coef) + y_mean
+    return roc_auc(Y_valid, (predictions >= cutoff).astype(float))
+
+
+def sweep_thresholds(X, W, thresholds, cutoff=0.1, test_size=0.25, seed=0, workers=1, block_size=10):
+    """Mean validation AUC of the per-ticker linear models for every inclusion threshold.
+
+    X is scaled and split once, and the pseudo-inverse of the centred training design is
+    computed once and shared by every threshold/ticker pair. W holds the next-day weights
+    aligned with X; labels for a block of thresholds are built by broadcasting. Blocks can
+    be spread across `workers` processes. Returns (mean_aucs, aucs) where aucs is
+    (thresholds x tickers) with NaN for single-class validation columns.
+    """
+    X_scaled = standardize(X)
+    W = np.asarray(W, dtype=float)
+    thresholds = np.asarray(thresholds, dtype=float)
+    train, valid = split_indices(len(X_scaled), test_size=test_size, seed=seed)
+
+    x_mean = X_scaled[train].mean(axis=0)
+    solver = np.linalg.pinv(X_scaled[train] - x_mean)
+    X_valid_centered = X_scaled[valid] - x_mean
+
+    blocks = [thresholds[i:i + block_size] for i in range(0, len(thresholds), block_size)]
+    args = [(solver, X_valid_centered, W[train], W[valid], block, cutoff) for block in blocks]
+    if workers == 1:
+        results = [_sweep_block(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_sweep_block, *zip(*args)))
+
+    aucs = np.vstack(results)
+    with np.errstate(invalid='ignore'):
+        counts = (~np.isnan(aucs)).sum(axis=1)
+        mean_aucs = np.where(counts > 0, np.nansum(aucs, axis=1) / np.maximum(counts, 1), np.nan)
+    return mean_aucs, aucs
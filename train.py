@@ -1,70 +1,61 @@
-import pandas as pd 
 import numpy as np 
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import accuracy_score, roc_curve, roc_auc_score, RocCurveDisplay
-import matplotlib.pyplot as plt
-from sklearn.preprocessing import StandardScaler
-
-# read weights and set date to index
-weights = pd.read_csv('optimized_portfolio_weights_daily.csv')
-weights.columns.values[0] = 'date'
-weights.set_index('date', inplace = True)
+from feature_labels import build_dataset, labels_frame, scaling, split_indices, standardize
+from regression import fit_multi_target, predict, to_labels
+from metrics import evaluate
+from model_artifact import save_model
+from reporting import save_roc_grid
+from instrumentation import run, stage
 
 # set threshold to be included in portfolio 
 threshold = .000001 
 
-# mask weights
-weights[weights<threshold] = 0
-weights[weights>=threshold] = 1
-weights.to_csv('weights_labels.csv')
+# Set to True to save every ticker's ROC curve as one multi-panel figure (roc_curves_train.png); off for batch runs
+report = False
 
-# get features
-features = pd.read_csv('feature_data.csv')
-features.set_index('Date', inplace = True)
-merged = pd.merge(left = weights, right = features, left_index = True,right_index = True)
-merged.to_csv("features_and_labels.csv")
 
-X = merged[['XLV.PH', '.TRGSPI', '.TRGSPS', 'VNQ', 'SDY', 'XLU','SPLV.K','XLI', 'XLP', '.BCOMCLC', 'SLX', '.DRG', '.MIWO0CS00PUS', 'GE', 'BA', '.BCOMKWC']]
-y = merged.iloc[:,:65]
+feature_cols = ['XLV.PH', '.TRGSPI', '.TRGSPS', 'VNQ', 'SDY', 'XLU','SPLV.K','XLI', 'XLP', '.BCOMCLC', 'SLX', '.DRG', '.MIWO0CS00PUS', 'GE', 'BA', '.BCOMKWC']
 
-# Shift y upwards by one row
-y = y.shift(-1)
+with run('train'):
+    # masked weights joined to features, with each row's labels taken from the next day (cached)
+    with stage('build_labels'):
+        data = build_dataset(feature_cols, threshold)
+        X = data.X
+        y = labels_frame(data)
 
-# Drop the last row from X and the first row from y
-X = X.iloc[:-1, :]
-y = y.iloc[:-1, :]
+    # Continue with scaling and model training
+    X_scaled = standardize(X)
 
-# Continue with scaling and model training
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X)
+    train_rows, valid_rows = split_indices(len(X_scaled))
+    X_train, X_valid = X_scaled[train_rows], X_scaled[valid_rows]
+    y_train, y_valid = y.iloc[train_rows], y.iloc[valid_rows]
 
+    # One least-squares solve for every ticker, then predictions and 0.1 cutoff labels for all of them
+    with stage('fit') as st:
+        coef, intercept = fit_multi_target(X_train, y_train.values)
+        y_pred_all = to_labels(predict(X_valid, coef, intercept), 0.1)
+        st.count('targets', y_train.shape[1])
 
-X_train, X_valid, y_train, y_valid = train_test_split(X_scaled, y, shuffle = True)
+    # Save the coefficients and feature scaling so daily_update.py can score new days without retraining
+    x_mean, x_scale = scaling(X)
+    save_model('inclusion_model.npz', coef, intercept, x_mean, x_scale, feature_cols, y.columns, cutoff=0.1,
+               trained_through=data.dates[-1])
 
-"""model = LinearRegression()
-model.fit(X_train, y_train)
-y_pred = model.predict(X_valid)
-acc = accuracy_score(y_pred, y_valid)
-print(acc)"""
+    # AUC and accuracy for every ticker in one pass; single-class columns are flagged as degenerate
+    with stage('evaluate'):
+        results = evaluate(y_valid.values, y_pred_all, y_valid.columns)
 
-aucs = []
-for i in y_train:
-    y = y_train[i].values.reshape(-1,1)
-    model = LinearRegression()
-    model.fit(X_train, y)
-    y_pred = model.predict(X_valid)
-    y_pred[y_pred < 0.1] = 0
-    y_pred[y_pred >= 0.1] = 1
-    try: 
-        acc = accuracy_score(y_pred, y_valid[i])
-        fpr, tpr, thresholds = roc_curve(y_valid[i], y_pred)
-        auc = roc_auc_score(y_valid[i], y_pred)
-        aucs += [auc]
+    for ticker in y_valid.columns:
+        if results.loc[ticker, 'degenerate']:
+            print('guessed all zeroes')
+            continue
+        auc = results.loc[ticker, 'auc']
         if auc>0.5:
-            print(i + " auc score: " + str(auc))
-        RocCurveDisplay.from_predictions(y_valid[i], y_pred)
-    except: 
-        print('guessed all zeroes')
+            print(ticker + " auc score: " + str(auc))
+
+    # All ROC curves in one figure, drawn once from the prediction matrix
+    if report:
+        with stage('report'):
+            save_roc_grid(y_valid.values, y_pred_all, results, 'roc_curves_train.png')
 
-print(np.average(aucs))
\ No newline at end of file
+    aucs = results.loc[~results['degenerate'], 'auc']
+    print(np.average(aucs))
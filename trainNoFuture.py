@@ -1,87 +1,76 @@
-import pandas as pd 
 import numpy as np 
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import accuracy_score, roc_curve, roc_auc_score, RocCurveDisplay
-import matplotlib.pyplot as plt
-from sklearn.preprocessing import StandardScaler
-import sys
-
-# read weights and set date to index
-weights = pd.read_csv('optimized_portfolio_weights_daily.csv')
-weights.columns.values[0] = 'date'
-weights.set_index('date', inplace = True)
+from feature_labels import build_dataset, labels_frame, scaling, standardize
+from regression import expanding_predictions, fit_multi_target
+from metrics import evaluate
+from model_artifact import save_model
+from reporting import save_roc_grid
+from instrumentation import run, stage
 
 # set threshold to be included in portfolio 
 threshold = .000001 
 
-# mask weights
-weights[weights<threshold] = 0
-weights[weights>=threshold] = 1
-weights.to_csv('weights_labels.csv')
+# Set to True to save every ticker's ROC curve as one multi-panel figure (roc_curves_noFuture.png); off for batch runs
+report = False
 
-# get features
-features = pd.read_csv('feature_data.csv')
-features.set_index('Date', inplace = True)
-merged = pd.merge(left = weights, right = features, left_index = True,right_index = True)
-merged.to_csv("features_and_labels.csv")
 
-X = merged[['XLV.PH', '.TRGSPI', '.TRGSPS', 'VNQ', 'SDY', 'XLU','SPLV.K','XLI', 'XLP', '.BCOMCLC', 'SLX', '.DRG', '.MIWO0CS00PUS', 'GE', "BA", ".BCOMKWC", "MUSA.K", ".BCOMCNC",".SOLLIT", ".BATTIDX1", "PEP.O_y", "TSLA.O", "MCD", "AAPL.O", "XME"]]
-y = merged.iloc[:,:65]
+feature_cols = ['XLV.PH', '.TRGSPI', '.TRGSPS', 'VNQ', 'SDY', 'XLU','SPLV.K','XLI', 'XLP', '.BCOMCLC', 'SLX', '.DRG', '.MIWO0CS00PUS', 'GE', "BA", ".BCOMKWC", "MUSA.K", ".BCOMCNC",".SOLLIT", ".BATTIDX1", "PEP.O", "TSLA.O", "MCD", "AAPL.O", "XME"]
 
-# Shift y upwards by one row
-y = y.shift(-1)
+def file_print(*args, **kwargs):
+    with open('noFutureOutput.txt', 'a') as f:
+        print(*args, **kwargs, file=f)
 
-# Drop the last row from X and the first row from y
-X = X.iloc[:-1, :]
-y = y.iloc[:-1, :]
+with run('trainNoFuture'):
+    # masked weights joined to features, with each row's labels taken from the next day (cached)
+    with stage('build_labels'):
+        data = build_dataset(feature_cols, threshold)
+        X = data.X
+        y = labels_frame(data)
 
-# Continue with scaling and model training
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X)
+    # Continue with scaling and model training
+    X_scaled = standardize(X)
 
-# Calculate the index to split the data on
-split_index = int(len(X_scaled) * 0.8)
+    # Calculate the index to split the data on
+    split_index = int(len(X_scaled) * 0.8)
 
-# Split the data without shuffling, ensuring that the model is trained on historical data only
-X_train, X_valid = X_scaled[:split_index], X_scaled[split_index:]
-y_train, y_valid = y[:split_index], y[split_index:]
+    # Split the data without shuffling, ensuring that the model is trained on historical data only
+    X_train, X_valid = X_scaled[:split_index], X_scaled[split_index:]
+    y_train, y_valid = y[:split_index], y[split_index:]
 
-"""model = LinearRegression()
-model.fit(X_train, y_train)
-y_pred = model.predict(X_valid)
-acc = accuracy_score(y_pred, y_valid)
-print(acc)"""
+    # Expanding-window fits on X_train[0:val] for every val from 490 on, all tickers at once,
+    # each predicting only the last validation row
+    with stage('fit_walk_forward') as st:
+        y_pred_all = expanding_predictions(X_train, y_train.values, 490, X_valid[-1:])
+        y_pred_all[y_pred_all < 0.1] = 0
+        y_pred_all[y_pred_all >= 0.1] = 1
+        st.count('steps', len(y_pred_all))
+        st.count('targets', y_train.shape[1])
 
-def file_print(*args, **kwargs):
-    with open('noFutureOutput.txt', 'a') as f:
-        print(*args, **kwargs, file=f)
+    # Save a model fit on the whole training block, with the feature scaling also taken from the
+    # training rows only so nothing from the held-out block reaches the saved artifact
+    x_mean, x_scale = scaling(X[:split_index])
+    coef, intercept = fit_multi_target((X[:split_index] - x_mean) / x_scale, y_train.values)
+    save_model('inclusion_model_no_future.npz', coef, intercept, x_mean, x_scale, feature_cols, y.columns,
+               cutoff=0.1, trained_through=data.dates[split_index - 1])
+
+    # AUC and accuracy for every ticker in one pass; single-class columns are flagged as degenerate
+    with stage('evaluate'):
+        y_true_all = y_train.values[490:]
+        results = evaluate(y_true_all, y_pred_all, y_train.columns)
+
+    for ticker in y_train.columns:
+        if results.loc[ticker, 'degenerate']:
+            print(ticker +' guessed all zeroes')
+            file_print(ticker +' guessed all zeroes')
+            continue
+        auc = results.loc[ticker, 'auc']
+        print(ticker + " auc score: " + str(auc))
+        file_print(ticker + " auc score: " + str(auc))
 
-aucs = []
-for i in y_train:
-    y_pred = [] 
-    for num, x in enumerate(y_train[i][490:]): 
-        val = 490 + num 
-        y = y_train[i][0:val].values.reshape(-1,1)
-        X = X_train[0:val]
-        model = LinearRegression()
-        model.fit(X, y)
-        y_pr = model.predict(X_valid)
-        y_pr[y_pr < 0.1] = 0
-        y_pr[y_pr >= 0.1] = 1
-        y_pr = y_pr[-1][0]
-        y_pred += [y_pr]
-    try: 
-        acc = accuracy_score(y_pred, y_train[i][490:])
-        fpr, tpr, thresholds = roc_curve(y_train[i][490:], y_pred)
-        auc = roc_auc_score(y_train[i][490:], y_pred)
-        aucs += [auc]
-        print(i + " auc score: " + str(auc))
-        file_print(i + " auc score: " + str(auc))
-        RocCurveDisplay.from_predictions(y_train[i][490:], y_pred)
-    except: 
-        print(i +' guessed all zeroes')
-        file_print(i +' guessed all zeroes')
+    # All ROC curves in one figure, drawn once from the prediction matrix
+    if report:
+        with stage('report'):
+            save_roc_grid(y_true_all, y_pred_all, results, 'roc_curves_noFuture.png')
 
-print(np.average(aucs))
-file_print(np.average(aucs))
\ No newline at end of file
+    aucs = results.loc[~results['degenerate'], 'auc']
+    print(np.average(aucs))
+    file_print(np.average(aucs))
@@ -1,57 +1,54 @@
-import pandas as pd 
 import numpy as np 
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import accuracy_score, roc_curve, roc_auc_score, RocCurveDisplay
-import matplotlib.pyplot as plt
-from sklearn.preprocessing import StandardScaler
-
-# read weights and set date to index
-weights = pd.read_csv('optimized_portfolio_weights_daily.csv')
-weights.columns.values[0] = 'date'
-weights.set_index('date', inplace = True)
+from feature_labels import build_dataset, labels_frame, split_indices
+from regression import fit_multi_target, predict, to_labels
+from metrics import evaluate
+from model_artifact import save_model
+from reporting import save_roc_grid
+from instrumentation import run, stage
 
 # set threshold to be included in portfolio 
 threshold = .000001 
 
-# mask weights
-weights[weights<threshold] = 0
-weights[weights>=threshold] = 1
-weights.to_csv('weights_labels.csv')
-
-# get features
-features = pd.read_csv('feature_data.csv')
-features.set_index('Date', inplace = True)
-merged = pd.merge(left = weights, right = features, left_index = True,right_index = True)
-merged.to_csv("features_and_labels.csv")
-
-X = merged[['XLV.PH', '.TRGSPI', '.TRGSPS', 'VNQ', 'SDY', 'XLU', 'SPLV.K']]
-scaler = StandardScaler()
-scaler.fit_transform(X)
-
-y = merged.iloc[:,:65]
-
-X_train, X_valid, y_train, y_valid = train_test_split(X, y, shuffle = True)
-
-"""model = LinearRegression()
-model.fit(X_train, y_train)
-y_pred = model.predict(X_valid)
-acc = accuracy_score(y_pred, y_valid)
-print(acc)"""
-
-for i in y_train:
-    y = y_train[i].values.reshape(-1,1)
-    model = LinearRegression()
-    model.fit(X_train, y)
-    y_pred = model.predict(X_valid)
-    y_pred[y_pred < 0.1] = 0
-    y_pred[y_pred >= 0.1] = 1
-    try: 
-        acc = accuracy_score(y_pred, y_valid[i])
-        fpr, tpr, thresholds = roc_curve(y_valid[i], y_pred)
-        auc = roc_auc_score(y_valid[i], y_pred)
+# Set to True to save every ticker's ROC curve as one multi-panel figure (roc_curves_last.png); off for batch runs
+report = False
+
+
+feature_cols = ['XLV.PH', '.TRGSPI', '.TRGSPS', 'VNQ', 'SDY', 'XLU', 'SPLV.K']
+
+with run('train_last'):
+    # masked weights joined to same-day features (cached)
+    with stage('build_labels'):
+        data = build_dataset(feature_cols, threshold, shift=False)
+        X = data.X
+        y = labels_frame(data)
+
+    train_rows, valid_rows = split_indices(len(X))
+    X_train, X_valid = X[train_rows], X[valid_rows]
+    y_train, y_valid = y.iloc[train_rows], y.iloc[valid_rows]
+
+    # One least-squares solve for every ticker, then predictions and 0.1 cutoff labels for all of them
+    with stage('fit') as st:
+        coef, intercept = fit_multi_target(X_train, y_train.values)
+        y_pred_all = to_labels(predict(X_valid, coef, intercept), 0.1)
+        st.count('targets', y_train.shape[1])
+
+    # Save the same-day model; its features are unscaled
+    save_model('inclusion_model_last.npz', coef, intercept, np.zeros(len(feature_cols)), np.ones(len(feature_cols)),
+               feature_cols, y.columns, cutoff=0.1, label_shift=0, trained_through=data.dates[-1])
+
+    # AUC and accuracy for every ticker in one pass; single-class columns are flagged as degenerate
+    with stage('evaluate'):
+        results = evaluate(y_valid.values, y_pred_all, y_valid.columns)
+
+    for ticker in y_valid.columns:
+        if results.loc[ticker, 'degenerate']:
+            print('guessed all zeroes')
+            continue
+        auc = results.loc[ticker, 'auc']
         if auc>0.5:
-            print(i + " auc score: " + str(auc))
-        RocCurveDisplay.from_predictions(y_valid[i], y_pred)
-    except: 
-        print('guessed all zeroes')
\ No newline at end of file
+            print(ticker + " auc score: " + str(auc))
+
+    # All ROC curves in one figure, drawn once from the prediction matrix
+    if report:
+        with stage('report'):
+            save_roc_grid(y_valid.values, y_pred_all, results, 'roc_curves_last.png')
@@ -0,0 +1,175 @@
+import argparse
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from feature_engineering import OUTPUT_CSV, engineered_columns
+from feature_labels import build_dataset, scaling
+from instrumentation import run, stage
+from metrics import evaluate
+from regression import fit_multi_target, predict, to_labels
+
+# Walk-forward cross-validation of the per-ticker inclusion models: every fold trains on rows
+# strictly before its test block, so no future data reaches the fit or the feature scaling.
+# Usage: python walk_forward_cv.py [--folds 10] [--embargo 1] [--window sliding --train-size 250] [--workers 4]
+#        [--engineered]
+
+# Rows are in date order; train rows are [train_start, train_stop) and test rows [test_start, test_stop)
+Fold = namedtuple('Fold', ['fold', 'train_start', 'train_stop', 'test_start', 'test_stop'])
+
+threshold = .000001
+cutoff = 0.1
+feature_cols = ['XLV.PH', '.TRGSPI', '.TRGSPS', 'VNQ', 'SDY', 'XLU', 'SPLV.K', 'XLI', 'XLP', '.BCOMCLC', 'SLX', '.DRG',
+                '.MIWO0CS00PUS', 'GE', 'BA', '.BCOMKWC']
+
+
+def walk_forward_folds(num_rows, num_folds=5, min_train=None, embargo=0, window='expanding', train_size=None):
+    """Consecutive, equally sized test blocks after the first min_train rows, one per fold.
+
+    Each fold trains on the rows before its test block minus an embargo gap of `embargo`
+    rows. window='expanding' trains from row 0, window='sliding' on only the last
+    train_size rows (default min_train). With labels taken from the next date, an embargo
+    of at least 1 keeps the last training label out of the test block.
+    """
+    if window not in ('expanding', 'sliding'):
+        raise ValueError(f"window must be 'expanding' or 'sliding', not {window!r}")
+    min_train = num_rows // (num_folds + 1) if min_train is None else min_train
+    train_size = min_train if train_size is None else train_size
+    bounds = np.linspace(min_train + embargo, num_rows, num_folds + 1).astype(int)
+    if bounds[1] <= bounds[0]:
+        raise ValueError(f"{num_rows} rows are too few for {num_folds} folds after {min_train} training rows")
+
+    folds = []
+    for fold, (test_start, test_stop) in enumerate(zip(bounds[:-1], bounds[1:])):
+        train_stop = test_start - embargo
+        train_start = 0 if window == 'expanding' else max(0, train_stop - train_size)
+        folds.append(Fold(fold, train_start, int(train_stop), int(test_start), int(test_stop)))
+    return folds
+
+
+# Arrays the worker processes read; filled from shared memory by _attach
+_shared = {}
+
+
+def _share(arrays):
+    """Copy arrays into shared memory blocks and return (blocks, specs for _attach)."""
+    blocks, specs = [], {}
+    for name, array in arrays.items():
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+        blocks.append(block)
+        specs[name] = (block.name, array.shape, array.dtype.str)
+    return blocks, specs
+
+
+def _attach(specs):
+    """Worker initializer: read-only views of the parent's shared arrays, no copies."""
+    for name, (block_name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        array.flags.writeable = False
+        _shared[name] = array
+        _shared[name + '_block'] = block
+
+
+def evaluate_fold(fold, X=None, Y=None, cutoff=0.1):
+    """Fit every ticker on the fold's training rows and score its test rows.
+
+    Features are scaled with the training rows' mean and deviation only. X and Y default
+    to the shared arrays of a worker process. Returns metrics.evaluate's table, indexed by
+    target column.
+    """
+    X = _shared['X'] if X is None else X
+    Y = _shared['Y'] if Y is None else Y
+    X_train, Y_train = X[fold.train_start:fold.train_stop], Y[fold.train_start:fold.train_stop]
+    x_mean, x_scale = scaling(X_train)
+    coef, intercept = fit_multi_target((X_train - x_mean) / x_scale, Y_train)
+    X_test = (X[fold.test_start:fold.test_stop] - x_mean) / x_scale
+    y_pred = to_labels(predict(X_test, coef, intercept), cutoff)
+    return evaluate(Y[fold.test_start:fold.test_stop], y_pred, np.arange(Y.shape[1]))
+
+
+def cross_validate(X, Y, tickers, folds, cutoff=0.1, workers=1):
+    """Per-fold and aggregate AUC tables for every ticker over the given folds.
+
+    With workers > 1 the folds run in a process pool that reads X and Y from shared
+    memory, so the data is not copied per worker or per fold. Returns (per_fold, summary):
+    per_fold has one row per (fold, ticker) with metrics.evaluate's columns and the fold's
+    row ranges; summary has each ticker's mean, std, min and max AUC over the folds where
+    its labels have both classes, plus its mean accuracy.
+    """
+    X = np.ascontiguousarray(X, dtype=float)
+    Y = np.ascontiguousarray(Y, dtype=float)
+    if workers == 1:
+        results = [evaluate_fold(fold, X, Y, cutoff) for fold in folds]
+    else:
+        blocks, specs = _share({'X': X, 'Y': Y})
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(specs,)) as executor:
+                results = list(executor.map(evaluate_fold, folds, [None] * len(folds), [None] * len(folds),
+                                            [cutoff] * len(folds)))
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    tables = []
+    for fold, table in zip(folds, results):
+        table.index = pd.Index(tickers, name='ticker')
+        table = table.reset_index()
+        for position, field in enumerate(Fold._fields):
+            table.insert(position, field, getattr(fold, field))
+        tables.append(table)
+    per_fold = pd.concat(tables, ignore_index=True)
+
+    scored = per_fold[~per_fold['degenerate']]
+    summary = scored.groupby('ticker', sort=False)['auc'].agg(['mean', 'std', 'min', 'max', 'count'])
+    summary.columns = ['mean_auc', 'std_auc', 'min_auc', 'max_auc', 'folds_scored']
+    summary = summary.reindex(pd.Index(tickers, name='ticker'))
+    summary['folds_scored'] = summary['folds_scored'].fillna(0).astype(int)
+    summary['mean_accuracy'] = per_fold.groupby('ticker', sort=False)['accuracy'].mean()
+    return per_fold, summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Walk-forward cross-validation of the inclusion models.')
+    parser.add_argument('--folds', type=int, default=10)
+    parser.add_argument('--embargo', type=int, default=1, help='rows dropped between each training and test block')
+    parser.add_argument('--window', choices=['expanding', 'sliding'], default='expanding')
+    parser.add_argument('--min-train', type=int, default=None, help='rows before the first test block')
+    parser.add_argument('--train-size', type=int, default=None, help='training rows per fold with --window sliding')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--engineered', action='store_true',
+                        help='use the log-return features from feature_engineering.py instead of raw closes')
+    args = parser.parse_args()
+
+    with run('walk_forward_cv'):
+        with stage('build_labels'):
+            if args.engineered:
+                # Rows without enough history for every transform are dropped
+                data = build_dataset(engineered_columns(feature_cols), threshold, features_csv=OUTPUT_CSV,
+                                     export_csv=False)
+                complete = ~np.isnan(data.X).any(axis=1)
+                data = data._replace(X=data.X[complete], Y=data.Y[complete], dates=data.dates[complete])
+            else:
+                data = build_dataset(feature_cols, threshold, export_csv=False)
+
+        folds = walk_forward_folds(len(data.X), args.folds, min_train=args.min_train, embargo=args.embargo,
+                                   window=args.window, train_size=args.train_size)
+        with stage('cross_validate') as st:
+            per_fold, summary = cross_validate(data.X, data.Y, data.tickers, folds, cutoff, workers=args.workers)
+            st.count('folds', len(folds))
+            st.count('targets', len(data.tickers))
+
+        per_fold.to_csv('walk_forward_folds.csv', index=False)
+        summary.to_csv('walk_forward_summary.csv')
+
+    fold_means = per_fold[~per_fold['degenerate']].groupby('fold')['auc'].mean()
+    for fold in folds:
+        print(f"fold {fold.fold}: train rows {fold.train_start}-{fold.train_stop - 1}, "
+              f"test rows {fold.test_start}-{fold.test_stop - 1}, mean auc {fold_means.get(fold.fold, np.nan):.4f}")
+    print(f"Mean auc over tickers and folds: {summary['mean_auc'].mean():.4f}")
+    print("Per-fold results saved to walk_forward_folds.csv, per-ticker summary to walk_forward_summary.csv")